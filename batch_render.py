@@ -0,0 +1,184 @@
+"""Renders the graphs of every route to image files without the UI"""
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+import plotting
+from data_cache import load_dataset
+from histograms import PriceHistograms
+from indexes import RouteIndex
+from streaming import load_store
+
+GRAPHS = ["price", "availability"]
+# the dataset and indexes of a worker process, set by init_worker
+_worker = {}
+
+
+def load_routes(path, stream=False):
+    """
+    Loads a dataset along with its route index
+
+    :param path: A string of the path to the csv file
+    :param stream: optional. True to use the on-disk store of the dataset
+    :return: A tuple of the dataframe and its RouteIndex
+    """
+    if stream:
+        store = load_store(path)
+        return store["df"], store["routes"]
+    df = load_dataset(path)
+    return df, RouteIndex(df)
+
+
+def init_worker(path, stream, settings):
+    """
+    Loads the dataset once in each worker process
+
+    :param path: A string of the path to the csv file
+    :param stream: True to use the on-disk store of the dataset
+    :param settings: A dictionary of the output directory, format, dpi and
+     the graphs to draw
+    """
+    df, routes = load_routes(path, stream)
+    _worker.update(settings, df=df, routes=routes,
+                   histograms=PriceHistograms(df, routes))
+
+
+def get_file_name(source, end, graph, fmt):
+    """
+    Gets the name of a route's image file
+
+    :param source: A string representing the departure airport
+    :param end: A string representing the arrival airport
+    :param graph: A string of the graph drawn in the file
+    :param fmt: A string of the image format, such as png or svg
+    :return: A string of the file name
+    """
+    name = f"{source}_{end}_{graph}"
+    return re.sub(r"[^\w.-]+", "-", name) + f".{fmt}"
+
+
+def draw_route(ax, graph, source, end):
+    """
+    Draws one of a route's graphs in the same way as the UI
+
+    :param ax: A matplotlib axes to draw on
+    :param graph: A string of the graph to draw, one of GRAPHS
+    :param source: A string representing the departure airport
+    :param end: A string representing the arrival airport
+    """
+    if graph == "price":
+        bins = (_worker["histograms"].edges,
+                _worker["histograms"].get_route(source, end))
+        plotting.draw_dist_plot(ax, bins, (source, end))
+    elif graph == "availability":
+        data = _worker["df"].take(_worker["routes"].get_positions(source, end))
+        plotting.draw_custom_plot(
+            ax, data, "Count", {"x": "departure_time", "hue": "arrival_time"},
+            f"Flight availability from {source} to {end}")
+
+
+def render_route(route):
+    """
+    Renders the graphs of a route in a worker process
+
+    :param route: A tuple of the departure and arrival airports
+    :return: A list of the paths of the files written
+    """
+    paths = []
+    for graph in _worker["graphs"]:
+        # a figure without pyplot is not tracked globally and is freed
+        # as soon as it is saved
+        figure = Figure(figsize=_worker["size"], dpi=_worker["dpi"])
+        draw_route(figure.subplots(), graph, *route)
+        path = os.path.join(_worker["output"],
+                            get_file_name(*route, graph, _worker["format"]))
+        figure.savefig(path)
+        paths.append(path)
+    return paths
+
+
+def select_routes(routes, sources=None, destinations=None):
+    """
+    Gets the routes of the index that match a filter
+
+    :param routes: A RouteIndex
+    :param sources: optional. A list of departure airports to keep
+    :param destinations: optional. A list of arrival airports to keep
+    :return: A list of (source, destination) tuples
+    """
+    return [(source, end) for source, end in routes.routes.get_keys()
+            if (not sources or source in sources)
+            and (not destinations or end in destinations)]
+
+
+def render_all(path, output, graphs=None, fmt="png", sources=None,
+               destinations=None, workers=None, dpi=100, size=(8, 6),
+               stream=False):
+    """
+    Renders the graphs of every selected route over a pool of processes
+
+    :param path: A string of the path to the csv file
+    :param output: A string of the directory to write the images to
+    :param graphs: optional. A list of the graphs to draw, all by default
+    :param fmt: optional. A string of the image format, such as png or svg
+    :param sources: optional. A list of departure airports to keep
+    :param destinations: optional. A list of arrival airports to keep
+    :param workers: optional. An integer of the number of processes
+    :param dpi: optional. An integer of the resolution of the images
+    :param size: optional. A tuple of the width and height in inches
+    :param stream: optional. True to use the on-disk store of the dataset
+    :return: A list of the paths of the files written
+    """
+    os.makedirs(output, exist_ok=True)
+    # loading here first writes the cache, so the workers only read it
+    _, routes = load_routes(path, stream)
+    selected = select_routes(routes, sources, destinations)
+    settings = {"output": output, "graphs": graphs or GRAPHS,
+                "format": fmt, "dpi": dpi, "size": size}
+    if workers is None:
+        workers = min(os.cpu_count() or 1, len(selected)) or 1
+    paths = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(path, stream, settings)) as executor:
+        chunksize = max(1, len(selected) // (workers * 4))
+        for written in executor.map(render_route, selected,
+                                    chunksize=chunksize):
+            paths.extend(written)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Render the graphs of every route to image files")
+    parser.add_argument("dataset", nargs="?",
+                        default=os.path.join(os.getcwd(), "Datasets",
+                                             "Indian Airlines.csv"),
+                        help="path to the flight data csv")
+    parser.add_argument("-o", "--output", default="charts",
+                        help="directory to write the images to")
+    parser.add_argument("-f", "--format", default="png",
+                        choices=["png", "svg", "pdf"],
+                        help="image format")
+    parser.add_argument("-g", "--graph", action="append", choices=GRAPHS,
+                        help="graph to draw, can be repeated. "
+                             "Draws every graph by default")
+    parser.add_argument("--source", action="append",
+                        help="only draw routes from this airport, "
+                             "can be repeated")
+    parser.add_argument("--destination", action="append",
+                        help="only draw routes to this airport, "
+                             "can be repeated")
+    parser.add_argument("-j", "--workers", type=int,
+                        help="number of processes, one per cpu by default")
+    parser.add_argument("--dpi", type=int, default=100,
+                        help="resolution of the images")
+    parser.add_argument("--stream", action="store_true",
+                        help="use the on-disk store of the dataset")
+    args = parser.parse_args()
+    written = render_all(args.dataset, args.output, args.graph, args.format,
+                         args.source, args.destination, args.workers,
+                         args.dpi, stream=args.stream)
+    print(f"wrote {len(written)} files to {args.output}")
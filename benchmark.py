@@ -0,0 +1,326 @@
+"""Benchmarks of the visualizer's model and graphs on synthetic datasets"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
+import pandas as pd
+import plotting
+from data_cache import load_dataset
+from model_logic import DataframeLogic
+from streaming import load_store
+from synthetic_data import write_csv
+
+SIZES = [10**5, 10**6]
+REPEAT = 5
+
+
+def render(draw, *args):
+    """
+    Draws a graph on a new figure and renders it like the UI's canvas
+
+    :param draw: A drawing function from plotting
+    :param args: Arguments of the drawing function after the axes
+    """
+    figure = Figure()
+    canvas = FigureCanvasAgg(figure)
+    draw(figure.subplots(), *args)
+    canvas.draw()
+
+
+def get_sample(logic):
+    """
+    Picks the route and flight code the scenarios query
+
+    :param logic: A DataframeLogic
+    :return: A dictionary of the route and flight code
+    """
+    route = logic.pair
+    logic.pair_city(*route)
+    codes = logic.get_flight_codes()
+    if not codes:
+        route = logic.routes.routes.get_keys()[0]
+        logic.pair_city(*route)
+        codes = logic.get_flight_codes()
+    return {"route": route, "flight": codes[0]}
+
+
+def get_scenarios(logic, sample):
+    """
+    Gets the scenarios to measure. Each one prepares the model and returns
+    the function to time, so only the work being measured is timed.
+
+    :param logic: A DataframeLogic
+    :param sample: A dictionary from get_sample
+    :return: A dictionary of scenario names to functions that prepare them
+    """
+    route = sample["route"]
+    flight = sample["flight"]
+
+    def model_state(method, *args):
+        def prepare():
+            logic.pair_city(*route)
+            return lambda: method(*args)
+        return prepare
+
+    def custom_draw(method, *args):
+        def prepare():
+            logic.pair_city(*route)
+            method(*args)
+            return lambda: render(plotting.draw_custom_plot, logic.cur_df,
+                                  logic.graph_type, logic.arguments,
+                                  logic.title)
+        return prepare
+
+    def dist_draw():
+        logic.pair_city(*route)
+        return lambda: render(plotting.draw_dist_plot, logic.get_price_bins(),
+                              logic.pair)
+
+    def correlation_text():
+        # mode 6 describes the attributes of the last correlation graph
+        logic.get_correlation_graph("days_left", "price")
+        return lambda: logic.describe_statistics(mode=6)
+
+    def summary_draw(index):
+        return lambda: lambda: render(plotting.draw_summary_plot,
+                                      logic.orig_df, index)
+
+    scenarios = {
+        "pair_city": model_state(logic.pair_city, *route),
+        "generate_price_analysis": model_state(
+            logic.generate_price_analysis, flight),
+        "analyse_price": model_state(logic.queries.analyse_price, *route,
+                                     flight),
+        "get_price_graph": model_state(logic.get_price_graph, *route),
+        "get_availability": model_state(logic.get_availability),
+        "get_airline_graph": model_state(logic.get_airline_graph, "Economy"),
+        "get_day_plot": model_state(logic.get_day_plot, flight),
+        "get_frequency_plot count": model_state(logic.get_frequency_plot,
+                                                "airline"),
+        "get_frequency_plot histogram": model_state(
+            logic.get_frequency_plot, "duration"),
+        "get_frequency_plot pie": model_state(logic.get_frequency_plot,
+                                              "airline", 2),
+        "get_correlation_graph": model_state(logic.get_correlation_graph,
+                                             "days_left", "price"),
+        "get_summary_graph": model_state(logic.get_summary_graph, 1),
+        "draw dist plot": dist_draw,
+        "draw availability": custom_draw(logic.get_availability),
+        "draw airline box": custom_draw(logic.get_airline_graph, "Economy"),
+        "draw day scatter": custom_draw(logic.get_day_plot, flight),
+        "draw frequency histogram": custom_draw(logic.get_frequency_plot,
+                                                "duration"),
+        "draw frequency pie": custom_draw(logic.get_frequency_plot,
+                                          "airline", 2),
+        "draw correlation scatter": custom_draw(logic.get_correlation_graph,
+                                                "days_left", "price"),
+    }
+    for mode in range(1, 6):
+        scenarios[f"describe_statistics {mode}"] = model_state(
+            logic.describe_statistics, flight, mode)
+    scenarios["describe_statistics 6"] = correlation_text
+    for index in range(3):
+        scenarios[f"draw summary {index}"] = summary_draw(index)
+    return scenarios
+
+
+def measure(function, repeat=REPEAT):
+    """
+    Times a function and measures the memory it allocates
+
+    :param function: A function without arguments
+    :param repeat: optional. An integer of the number of timed calls
+    :return: A dictionary of the timings in seconds and the peak of the
+     memory allocated by one call in bytes
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    # memory is traced in a separate call since tracing slows python down
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"first": times[0], "min": min(times),
+            "median": statistics.median(times), "max": max(times),
+            "repeat": repeat, "peak_bytes": peak}
+
+
+def get_dataset(rows, directory, **options):
+    """
+    Gets the path of a synthetic dataset, generating it the first time
+
+    :param rows: An integer of the number of rows
+    :param directory: A string of the directory to keep datasets in
+    :param options: routes, airlines, flights and seed for FlightGenerator
+    :return: A string of the path to the csv file
+    """
+    name = "_".join(f"{key}{value}" for key, value in sorted(options.items()))
+    path = os.path.join(directory, f"synthetic_{rows}_{name}.csv")
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        write_csv(path + ".tmp", rows, **options)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def run_size(path, repeat=REPEAT, stream=False, selected=None):
+    """
+    Runs every scenario on one dataset
+
+    :param path: A string of the path to the csv file
+    :param repeat: optional. An integer of the number of timed calls
+    :param stream: optional. True to open the on-disk store of the dataset
+    :param selected: optional. A list of strings, only scenarios whose name
+     contains one of them are run
+    :return: A list of dictionaries of results
+    """
+    # the first load writes the cache, the timed loads read it
+    def load():
+        return load_store(path) if stream else load_dataset(path)
+
+    def build():
+        return DataframeLogic(**load()) if stream else DataframeLogic(load())
+
+    load()
+    results = [{"scenario": "load", **measure(load, repeat)},
+               {"scenario": "build model", **measure(build, repeat)}]
+    logic = build()
+    # the app trains the fare model in the background once the data is
+    # loaded, so the price analysis is measured with it ready
+    logic.get_fare_model()
+    rows = len(logic.orig_df)
+    scenarios = get_scenarios(logic, get_sample(logic))
+    for name, prepare in scenarios.items():
+        if selected and not any(part in name for part in selected):
+            continue
+        results.append({"scenario": name, **measure(prepare(), repeat)})
+    for result in results:
+        result["rows"] = rows
+    return results
+
+
+def get_environment():
+    """
+    Describes the machine and library versions a run was made with
+
+    :return: A dictionary of the environment
+    """
+    return {"python": sys.version.split()[0], "platform": platform.platform(),
+            "processor": platform.processor(), "cpus": os.cpu_count(),
+            "numpy": np.__version__, "pandas": pd.__version__,
+            "matplotlib": matplotlib.__version__,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def compare(base, new, threshold=1.1):
+    """
+    Compares the median timings of two benchmark runs
+
+    :param base: A dictionary of the results of the earlier run
+    :param new: A dictionary of the results of the later run
+    :param threshold: optional. A float of the ratio of medians above which
+     a scenario is reported as slower, or faster below its inverse
+    :return: A formatted string of the comparison
+    """
+    old = {(result["rows"], result["scenario"]): result
+           for result in base["results"]}
+    lines = [f"{'rows':>11}  {'scenario':32}{'base':>10}{'new':>10}"
+             f"{'ratio':>8}"]
+    for result in new["results"]:
+        key = (result["rows"], result["scenario"])
+        if key not in old:
+            continue
+        ratio = result["median"] / max(old[key]["median"], 1e-9)
+        note = ""
+        if ratio > threshold:
+            note = "  slower"
+        elif ratio < 1 / threshold:
+            note = "  faster"
+        lines.append(f"{key[0]:>11,}  {key[1]:32}"
+                     f"{old[key]['median'] * 1000:>8.2f}ms"
+                     f"{result['median'] * 1000:>8.2f}ms{ratio:>8.2f}{note}")
+    return "\n".join(lines)
+
+
+def format_results(results):
+    """
+    Formats the results of a run as a table
+
+    :param results: A list of dictionaries of results
+    :return: A formatted string of the results
+    """
+    lines = [f"{'rows':>11}  {'scenario':32}{'median':>10}{'first':>10}"
+             f"{'peak':>10}"]
+    for result in results:
+        lines.append(f"{result['rows']:>11,}  {result['scenario']:32}"
+                     f"{result['median'] * 1000:>8.2f}ms"
+                     f"{result['first'] * 1000:>8.2f}ms"
+                     f"{result['peak_bytes'] / 2**20:>8.1f}MB")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the visualizer on synthetic datasets")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the benchmarks")
+    run.add_argument("--rows", type=int, nargs="+", default=SIZES,
+                     help="sizes of the synthetic datasets")
+    run.add_argument("--dataset", help="benchmark a csv file instead of "
+                                       "synthetic datasets")
+    run.add_argument("--routes", type=int, default=30)
+    run.add_argument("--airlines", type=int, default=6)
+    run.add_argument("--flights", type=int, default=1500)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--repeat", type=int, default=REPEAT)
+    run.add_argument("--stream", action="store_true",
+                     help="open the datasets as on-disk stores")
+    run.add_argument("-k", "--scenario", action="append",
+                     help="only run scenarios containing this text, "
+                          "can be repeated")
+    run.add_argument("--data-dir", default=os.path.join(".cache", "bench"),
+                     help="directory to keep the synthetic datasets in")
+    run.add_argument("-o", "--output", help="json file to save results to")
+    diff = commands.add_parser("compare", help="compare two saved runs")
+    diff.add_argument("base", help="json file of the earlier run")
+    diff.add_argument("new", help="json file of the later run")
+    diff.add_argument("--threshold", type=float, default=1.1)
+    args = parser.parse_args()
+    if args.command == "compare":
+        with open(args.base) as file:
+            base = json.load(file)
+        with open(args.new) as file:
+            new = json.load(file)
+        print(compare(base, new, args.threshold))
+    else:
+        if args.dataset:
+            paths = [args.dataset]
+        else:
+            paths = [get_dataset(rows, args.data_dir, routes=args.routes,
+                                 airlines=args.airlines,
+                                 flights=args.flights, seed=args.seed)
+                     for rows in args.rows]
+        results = []
+        for path in paths:
+            results.extend(run_size(path, args.repeat, args.stream,
+                                    args.scenario))
+        print(format_results(results))
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump({"environment": get_environment(),
+                           "options": vars(args), "results": results},
+                          file, indent=2)
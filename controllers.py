@@ -1,23 +1,50 @@
 """Controllers for the visualizer's UI"""
 import tkinter as tk
-import threading
 from tkinter import messagebox
 import abc
+from functools import partial
+from workers import BackgroundWorker
+from instrumentation import timed
+from visualizer_ui import PeriodWindow
+from prefix_index import PrefixIndex
+
+# keys that move through a combobox's dropdown rather than edit its text
+NAVIGATION_KEYS = {"Up", "Down", "Left", "Right", "Return", "Escape", "Tab",
+                   "Home", "End", "Prior", "Next"}
 
 
 class Controller:
     """A controller for the Visualizer UI"""
-    def __init__(self, ui, logic):
+    def __init__(self, ui, logic, worker=None):
         self.main = ui
         self.logic = logic
+        if worker is None:
+            worker = BackgroundWorker(self.main, on_busy=self.main.set_busy)
+        self.worker = worker
+        # redraw once per idle cycle however many events changed the model
+        self.logic.set_scheduler(self.main.after_idle)
         self.valid_airports = self.logic.get_airport_names()
+        self.airports = PrefixIndex(self.valid_airports)
+        # the values of each combobox that can be typed, by combobox number
+        self.suggestions = {}
         self.states = [AvailabilityState(self), DayState(self),
                        FrequencyState(self), AirlineState(self),
                        CorrelationState(self)]
         self.current_state = self.states[0]
+        self.watcher = None
+        self.watch_interval = 5000
+        # the partitioned dataset the model shows a time window of
+        self.partitions = None
+        self.window = None
+        # the column and direction the fare table is sorted by
+        self.fare_sort = None
+        # the city pair chosen on the flight search page, queries of the
+        # page are about it whatever the other pages select in the model
+        self.route = self.logic.pair
         self.get_combobox_values()
         self.get_default_graphs()
         self.bind_components()
+        self.train_fare_model()
 
     def bind_components(self):
         """Binds the widgets to their respective handlers"""
@@ -37,17 +64,227 @@ class Controller:
         self.main.next_button.bind("<ButtonRelease>", self.next_summary_page)
         self.main.comboboxes[6].bind("<<ComboboxSelected>>",
                                      self.get_summary_graph)
+        self.main.comboboxes[7].bind("<<ComboboxSelected>>",
+                                     self.get_valid_destination)
+        self.main.search_button.bind("<ButtonRelease>", self.search_fares)
+        for button, by in zip(self.main.itinerary_buttons,
+                              ["price", "duration"]):
+            button.bind("<ButtonRelease>",
+                        lambda event, by=by: self.search_itineraries(by))
+        for combobox in self.main.comboboxes:
+            combobox.bind("<KeyRelease>", self.filter_values, add="+")
+
+    def set_values(self, number, values):
+        """
+        Sets the values a combobox offers and can be typed into it
+
+        :param number: An integer of the combobox's position in comboboxes
+        :param values: A list of strings
+        """
+        index = PrefixIndex(values)
+        self.suggestions[number] = index
+        self.main.comboboxes[number]["values"] = index.complete("")
+
+    @timed()
+    def filter_values(self, event):
+        """
+        event handler for narrowing a combobox's dropdown to the values
+        starting with the text typed so far.
+        """
+        if event.keysym in NAVIGATION_KEYS:
+            return
+        number = self.main.comboboxes.index(event.widget)
+        if number in self.suggestions:
+            event.widget["values"] = self.suggestions[number].complete(
+                event.widget.get())
 
     def get_combobox_values(self):
-        self.main.comboboxes[0]["values"] = self.logic.get_airport_names()
+        self.set_values(0, self.logic.get_airport_names())
         self.main.comboboxes[0].current(newindex=0)
-        self.main.comboboxes[1]["values"] =\
-            self.logic.get_dest_airports("Delhi")
+        self.set_values(1, self.logic.get_dest_airports("Delhi"))
         self.main.comboboxes[1].current(newindex=0)
-        self.main.comboboxes[2]["values"] = self.logic.get_flight_codes()
+        self.set_values(2, self.logic.queries.get_flight_codes(*self.route))
         for i in range(3,5):
-            self.main.comboboxes[i]["values"] = self.valid_airports
+            self.set_values(i, self.valid_airports)
+        self.set_values(7, self.valid_airports)
+        self.set_values(8, [])
+        self.set_values(9, ["Any"] + self.logic.get_flight_class())
+        self.set_values(10, ["Any"] + self.logic.get_airlines())
+        self.set_values(11, ["Any"] + self.logic.get_stops())
+        for i in range(9, 12):
+            self.main.comboboxes[i].current(newindex=0)
+
+    @timed()
+    def append(self, df):
+        """
+        Adds new rows to the model and refreshes the widgets showing them.
+        Must be called on the Tk thread since the graphs are updated.
+
+        :param df: A dataframe of new flights
+        :return: A set of the (source, destination) routes that gained rows
+        """
+        routes = self.logic.append(df)
+        if routes:
+            self.refresh_values()
+        return routes
+
+    def refresh_values(self):
+        """Refreshes the airports and flight codes offered by the comboboxes"""
+        self.valid_airports = self.logic.get_airport_names()
+        self.airports = PrefixIndex(self.valid_airports)
+        self.set_values(0, self.valid_airports)
+        src = self.main.comboboxes[0].get()
+        if src in self.airports:
+            self.set_values(1, self.logic.get_dest_airports(src))
+        self.set_values(2, self.logic.queries.get_flight_codes(*self.route))
+        self.set_values(7, self.valid_airports)
+        self.set_values(10, ["Any"] + self.logic.get_airlines())
+        if self.current_state in self.states[:2]:
+            self.set_values(3, self.valid_airports)
+            src = self.main.comboboxes[3].get()
+            self.set_values(4, self.logic.get_dest_airports(src)
+                            if src in self.airports else self.valid_airports)
+
+    def use_partitions(self, dataset, window=None):
+        """
+        Lets the user pick the time window of a partitioned dataset shown
+        by the model
+
+        :param dataset: A PartitionedDataset
+        :param window: optional. A tuple of the first and last date the model
+         holds, None if it holds every partition
+        """
+        self.partitions = dataset
+        self.window = window
+        if dataset.get_periods():
+            self.main.menu_bar.entryconfigure(
+                "Period", state="normal", command=self.show_period_window)
+
+    def show_period_window(self):
+        """Opens the window to pick the time window, or raises it"""
+        window = self.main.period_window
+        if window is not None and window.winfo_exists():
+            window.lift()
+            return
+        window = PeriodWindow(self.main, self.partitions.get_periods(),
+                              self.window)
+        window.apply_button.configure(
+            command=lambda: self.set_window(window.get_window()))
+        window.all_button.configure(command=lambda: self.set_window(None))
+        self.main.period_window = window
+
+    def set_window(self, window):
+        """
+        Opens the partitions of a time window in the background and shows
+        them once they are loaded
+
+        :param window: A tuple of the first and last date, None for every
+         partition
+        """
+        if not self.partitions.prune(window):
+            self.raise_invalid_message("No flights in this period")
+            return
+        self.window = window
+        self.worker.submit("period", self.partitions.open, self.show_window,
+                           window)
+
+    def show_window(self, data):
+        """
+        Replaces the model's data with the partitions of the time window
+
+        :param data: A dictionary of the dataframe and indexes of the window
+        """
+        self.logic.load(**data)
+        self.refresh_values()
+        self.train_fare_model()
+
+    def train_fare_model(self):
+        """
+        Loads or trains the fare model in the background, the price
+        analysis leaves out the forecast until it is ready
+        """
+        # later analyses pick the model up, there is nothing to show
+        self.worker.submit("fare model", self.logic.get_fare_model,
+                           lambda model: None, busy=False)
+
+    def watch(self, path, interval=5000):
+        """
+        Adds the rows appended to a csv file, or the csv files added to a
+        directory, while the app is running. A partitioned dataset is
+        watched for partitions instead, see check_partitions.
+
+        :param path: A string of the path to a csv file or a directory
+        :param interval: optional. An integer of milliseconds between checks
+        """
+        self.watch_interval = interval
+        if self.partitions is not None:
+            self.main.after(interval, self.check_partitions)
+            return
+        # pandas is imported with the model, not before the window is shown
+        from file_watch import FileWatcher
+        self.watcher = FileWatcher(path)
+        self.main.after(interval, self.check_watch)
+
+    def check_partitions(self):
+        """Scans the partitioned dataset for changed files in the background"""
+        self.worker.submit("partition watch", self.partitions.rescan,
+                           self.show_partitions, busy=False,
+                           on_error=self.retry_partitions)
+
+    def show_partitions(self, periods):
+        """
+        Offers the periods of new partitions and loads the time window again
+        if partitions in it changed, then schedules the next check.
+
+        :param periods: A list of the periods of the changed partitions
+        """
+        try:
+            if periods:
+                self.use_partitions(self.partitions, self.window)
+                if any(self.partitions.in_window(period, self.window)
+                       for period in periods):
+                    self.set_window(self.window)
+        finally:
+            self.main.after(self.watch_interval, self.check_partitions)
+
+    def retry_partitions(self, error):
+        """
+        Schedules the next scan of the partitioned dataset after a scan
+        failed, so watching goes on
+
+        :param error: The exception the scan raised
+        """
+        self.main.after(self.watch_interval, self.check_partitions)
+
+    def check_watch(self):
+        """Reads the watched files in the background"""
+        self.worker.submit("file watch", self.watcher.check,
+                           self.show_new_rows, busy=False,
+                           on_error=self.retry_watch)
+
+    def show_new_rows(self, df):
+        """
+        Adds the rows read from the watched files and schedules the next
+        check.
+
+        :param df: A dataframe of new rows, None if there are none
+        """
+        try:
+            if df is not None:
+                self.append(df)
+        finally:
+            self.main.after(self.watch_interval, self.check_watch)
+
+    def retry_watch(self, error):
+        """
+        Schedules the next check of the watched files after a check failed,
+        such as on a malformed line, so watching goes on
+
+        :param error: The exception the check raised
+        """
+        self.main.after(self.watch_interval, self.check_watch)
 
+    @timed()
     def prev_summary_page(self, event):
         """
         event handler for getting the previous page of the summary.
@@ -60,6 +297,7 @@ class Controller:
         self.main.text_boxes[2].config(state="disabled")
         self.logic.get_summary_graph()
 
+    @timed()
     def next_summary_page(self, event):
         """
         event handler for getting the next page of the summary.
@@ -72,66 +310,193 @@ class Controller:
         self.main.text_boxes[2].config(state="disabled")
         self.logic.get_summary_graph()
 
+    @timed()
     def get_summary_graph(self, event):
         """
         event handler for notifying graphs in the summary page.
         """
         self.logic.get_summary_graph(event.widget.current())
 
+    @timed()
     def get_valid_destination(self, event):
         """
         event handler for updating valid destinations.
         """
         src = event.widget.get()
-        if src not in self.valid_airports:
+        if src not in self.airports:
             self.raise_invalid_message("Invalid airport")
             return
         index = self.main.comboboxes.index(event.widget)
         if index == 0:
-            self.main.comboboxes[1]["values"] = (
-                self.logic.get_dest_airports(src))
+            self.set_values(1, self.logic.get_dest_airports(src))
             self.main.comboboxes[1].delete(0, "end")
             self.main.comboboxes[2].delete(0, "end")
             self.main.comboboxes[2].config(state="disabled")
         elif index == 3:
-            self.main.comboboxes[4]["values"] = (
-                self.logic.get_dest_airports(src))
+            self.set_values(4, self.logic.get_dest_airports(src))
             self.main.comboboxes[4].delete(0, "end")
+        elif index == 7:
+            self.set_values(8, self.logic.get_dest_airports(src))
+            self.main.comboboxes[8].delete(0, "end")
 
     def get_default_graphs(self):
         """
         gets the default graphs on startup.
         """
         for graphs in self.main.graphs:
-            self.logic.attach(graphs)
+            self.logic.attach(graphs, graphs.type)
         self.logic.notify()
 
+    @timed()
     def update_dist_graph(self, event):
         """event handler for updating the flight search page's graph."""
         if event.widget.get() != "":
             src = self.main.comboboxes[0].get()
-            if src not in self.valid_airports:
+            if src not in self.airports:
                 self.raise_invalid_message("Invalid airport")
                 return
             self.main.comboboxes[2].config(state="active")
             self.main.comboboxes[2].delete(0, "end")
-            update_thread = threading.Thread(target=self.logic.get_price_graph(
-                src, event.widget.get()))
-            update_thread.start()
-            self.main.comboboxes[2]["values"] = self.logic.get_flight_codes()
+            end = event.widget.get()
+            self.worker.submit("flight search",
+                               self.logic.queries.get_flight_codes,
+                               partial(self.show_price_graph, src, end),
+                               src, end)
+
+    @timed()
+    def show_price_graph(self, src, end, codes):
+        """
+        Selects the flight search page's route and draws its graph once its
+        flights are found.
+
+        :param src: A string representing the departure airport
+        :param end: A string representing the arrival airport
+        :param codes: A tuple of the flight codes of the route
+        """
+        self.route = (src, end)
+        self.logic.pair_city(src, end)
+        self.logic.notify()
+        self.set_values(2, codes)
 
+    @timed()
     def get_price_analysis(self, event):
         """event handler for getting the flight search's textbox."""
         for i in range(3):
             if self.main.comboboxes[i].get() == "":
                 return
         flight = event.widget.get()
+        if flight not in self.suggestions[2]:
+            self.show_price_analysis("Flight not found")
+            return
+        self.worker.submit("price analysis", self.logic.queries.analyse_price,
+                           self.show_price_analysis, *self.route, flight)
+
+    @timed()
+    def show_price_analysis(self, analysis):
+        """
+        Shows the flight search's price analysis.
+
+        :param analysis: A string of the analysis to show
+        """
         self.main.text_boxes[0].config(state="normal")
         self.main.text_boxes[0].delete(1.0, "end")
-        self.main.text_boxes[0].insert(tk.END,
-                                    self.logic.generate_price_analysis(flight))
+        self.main.text_boxes[0].insert(tk.END, analysis)
         self.main.text_boxes[0].config(state="disabled")
 
+    @timed()
+    def search_fares(self, event):
+        """event handler for finding the cheapest fares of a route."""
+        src = self.main.comboboxes[7].get()
+        end = self.main.comboboxes[8].get()
+        if src not in self.airports or end not in self.suggestions[8]:
+            self.raise_invalid_message("Invalid airport")
+            return
+        choices = []
+        for i in range(9, 12):
+            choice = self.main.comboboxes[i].get()
+            if choice not in self.suggestions[i]:
+                self.raise_invalid_message("Invalid choice")
+                return
+            choices.append(None if choice == "Any" else choice)
+        try:
+            days = sorted(int(spinbox.get())
+                          for spinbox in self.main.spinboxes[:2])
+            count = int(self.main.spinboxes[2].get())
+        except ValueError:
+            self.raise_invalid_message("Invalid number")
+            return
+        f_class, airline, stops = choices
+        self.worker.submit("fare search", self.logic.get_cheapest_fares,
+                           self.show_fares, src, end, f_class, tuple(days),
+                           airline and [airline], stops and [stops], count)
+
+    @timed()
+    def search_itineraries(self, by):
+        """
+        Finds the best itineraries between the chosen cities, with
+        connecting flights through any city.
+
+        :param by: A string of "price" or "duration" to optimize for
+        """
+        src = self.main.comboboxes[7].get()
+        end = self.main.comboboxes[8].get()
+        if src not in self.airports or end not in self.airports:
+            self.raise_invalid_message("Invalid airport")
+            return
+        f_class = self.main.comboboxes[9].get()
+        if f_class not in self.suggestions[9]:
+            self.raise_invalid_message("Invalid choice")
+            return
+        try:
+            count = int(self.main.spinboxes[2].get())
+        except ValueError:
+            self.raise_invalid_message("Invalid number")
+            return
+        self.worker.submit("itinerary search", self.logic.get_itineraries,
+                           self.show_fares, src, end,
+                           None if f_class == "Any" else f_class, by, count)
+
+    @timed()
+    def show_fares(self, fares):
+        """
+        Fills the fare table with the cheapest fares or itineraries.
+
+        :param fares: A dataframe of the fares or itineraries, best first
+        """
+        table = self.main.fare_table
+        columns = tuple(fares.columns)
+        if tuple(table["columns"]) != columns:
+            table["columns"] = columns
+            for column in columns:
+                table.heading(column, text=column, command=lambda
+                              column=column: self.sort_fares(column))
+        table.delete(*table.get_children())
+        # durations are stored as float32, round off the conversion noise
+        fares = fares.assign(duration=fares.duration.astype(float).round(2))
+        for row in fares.itertuples(index=False):
+            table.insert("", tk.END, values=list(row))
+        self.fare_sort = None
+
+    def sort_fares(self, column):
+        """
+        Sorts the fare table by a column, in reverse if it is already
+        sorted by it.
+
+        :param column: A string of the column to sort by
+        """
+        table = self.main.fare_table
+        reverse = self.fare_sort == (column, False)
+        rows = [(table.set(item, column), item)
+                for item in table.get_children()]
+        try:
+            rows = [(float(value), item) for value, item in rows]
+        except ValueError:
+            pass
+        rows.sort(reverse=reverse)
+        for position, (_, item) in enumerate(rows):
+            table.move(item, "", position)
+        self.fare_sort = (column, reverse)
+
     def raise_invalid_message(self, msg):
         """
         Raises an error message.
@@ -143,11 +508,12 @@ class Controller:
         tk.messagebox.showerror("Value error",
                                 message=msg)
 
+    @timed()
     def tab_load_graph(self, event):
         """event handler for switching notebook tabs"""
         if event.widget.index("current") == 0:
             self.logic.state = 1
-            self.logic.pair_city("Delhi", "Mumbai")
+            self.logic.pair_city(*self.route)
         elif event.widget.index("current") == 1:
             self.logic.state = 2
             self.main.mode.children["!radiobutton"].invoke()
@@ -158,6 +524,7 @@ class Controller:
             self.main.text_boxes[2].insert(
                 tk.END, self.logic.get_summary_text())
 
+    @timed()
     def set_attribute_tab(self):
         """
         event handler for setting the attributes tab in the flight planner
@@ -166,11 +533,13 @@ class Controller:
         self.current_state = self.states[self.main.mode.var.get()]
         self.current_state.set_components()
 
+    @timed()
     def generate_graph(self, event):
         """event handler for generating graphs in the flight planner page"""
         self.current_state = self.states[self.main.mode.var.get()]
         self.current_state.get_graph()
 
+    @timed()
     def temp_get_combobox_values(self, event):
         """
         event handler for updating combobox values in the flight planner page.
@@ -217,22 +586,31 @@ class AvailabilityState(ControllerState):
         self.controller.main.labels[0]["text"] = "From:"
         self.controller.main.labels[1]["text"] = "To:"
         for i in range(3, 5):
-            self.controller.main.comboboxes[i]["values"] = (
-                self.controller.valid_airports)
+            self.controller.set_values(i, self.controller.valid_airports)
             self.controller.main.comboboxes[i].delete(0, "end")
         self.controller.main.comboboxes[5].config(state="disabled")
 
     def get_graph(self):
         src = self.controller.main.comboboxes[3].get()
         end = self.controller.main.comboboxes[4].get()
-        update_thread = threading.Thread(
-            target=self.controller.logic.pair_city(src, end))
-        update_thread.start()
+        self.controller.worker.submit(
+            "flight planner", self.controller.logic.queries.describe_departures,
+            partial(self.show, src, end), src, end)
+
+    def show(self, src, end, description):
+        """
+        Selects the city pair and draws its availability graph and
+        statistics on the Tk thread.
+
+        :param src: A string representing the departure airport
+        :param end: A string representing the arrival airport
+        :param description: A string of the departure statistics
+        """
+        self.controller.logic.pair_city(src, end)
         self.controller.logic.get_availability()
         self.controller.main.text_boxes[1].config(state="normal")
         self.controller.main.text_boxes[1].delete(1.0, "end")
-        self.controller.main.text_boxes[1].insert(
-            tk.END, self.controller.logic.describe_statistics())
+        self.controller.main.text_boxes[1].insert(tk.END, description)
         self.controller.main.text_boxes[1].config(state="disabled")
 
     def update_component_values(self):
@@ -250,8 +628,7 @@ class DayState(ControllerState):
         self.controller.main.labels[0]["text"] = "From:"
         self.controller.main.comboboxes[3].delete(0, "end")
         for i in range(3, 5):
-            self.controller.main.comboboxes[i]["values"] = (
-                self.controller.valid_airports)
+            self.controller.set_values(i, self.controller.valid_airports)
             self.controller.main.comboboxes[i].delete(0, "end")
         self.controller.main.labels[1]["text"] = "To:"
         self.controller.main.comboboxes[4].delete(0, "end")
@@ -274,9 +651,21 @@ class DayState(ControllerState):
         src = self.controller.main.comboboxes[3].get()
         end = self.controller.main.comboboxes[4].get()
         self.controller.logic.graph_type = "Scatter"
+        self.controller.worker.submit(
+            "flight planner", self.controller.logic.queries.get_flight_codes,
+            partial(self.show_flight_codes, src, end), src, end)
+
+    def show_flight_codes(self, src, end, codes):
+        """
+        Selects the city pair and fills the flight code combobox on the Tk
+        thread.
+
+        :param src: A string representing the departure airport
+        :param end: A string representing the arrival airport
+        :param codes: A tuple of flight codes of the city pair
+        """
         self.controller.logic.pair_city(src, end)
-        self.controller.main.comboboxes[5]["values"] = (
-            self.controller.logic.get_flight_codes())
+        self.controller.set_values(5, codes)
 
 
 class FrequencyState(ControllerState):
@@ -288,22 +677,23 @@ class FrequencyState(ControllerState):
         """Refer to ControllerState.set_components"""
         self.controller.main.type["state"] = "disabled"
         self.controller.main.labels[0]["text"] = "x axis:"
-        self.controller.main.comboboxes[3]["values"] = (
-            self.controller.logic.get_countable_attributes())
+        self.controller.set_values(
+            3, self.controller.logic.get_countable_attributes())
         self.controller.main.comboboxes[3].delete(0, "end")
         self.controller.main.labels[1]["text"] = "y axis:"
-        self.controller.main.comboboxes[4]["values"] = ["Frequency"]
+        self.controller.set_values(4, ["Frequency"])
         self.controller.main.comboboxes[4].current(newindex=0)
         self.controller.main.comboboxes[5].delete(0, "end")
         self.controller.main.comboboxes[5].config(state="disabled")
         self.controller.main.type["state"] = "active"
         self.controller.main.type.children["!radiobutton"].invoke()
-        self.controller.main.type.set_button(2, "state", "disabled")
+        for button in (2, 4, 5):
+            self.controller.main.type.set_button(button, "state", "disabled")
 
     def get_graph(self):
         """Refer to ControllerState.get_graph"""
         var = self.controller.main.comboboxes[3].get()
-        if var not in self.controller.main.comboboxes[3]["values"]:
+        if var not in self.controller.suggestions[3]:
             self.controller.raise_invalid_message("Invalid attribute")
             return
         graph = self.controller.main.type.var.get()
@@ -327,12 +717,12 @@ class AirlineState(ControllerState):
         """Refer to ControllerState.set_components"""
         self.controller.main.type["state"] = "disabled"
         self.controller.main.labels[0]["text"] = "x axis:"
-        self.controller.main.comboboxes[3]["values"] = ["Airline"]
+        self.controller.set_values(3, ["Airline"])
         self.controller.main.comboboxes[3].current(newindex=0)
         self.controller.main.labels[1]["text"] = "y axis:"
         self.controller.main.comboboxes[4].delete(0, "end")
-        self.controller.main.comboboxes[4]["values"] =\
-            self.controller.logic.get_flight_class()
+        self.controller.set_values(
+            4, self.controller.logic.get_flight_class())
         self.controller.main.comboboxes[5].delete(0, "end")
         self.controller.main.comboboxes[5].config(state="disabled")
 
@@ -367,11 +757,12 @@ class CorrelationState(ControllerState):
         self.controller.main.comboboxes[4].delete(0, "end")
         self.controller.main.labels[2]["text"] = "Group by"
         for i in range(3, 5):
-            self.controller.main.comboboxes[i]["values"] = (
-                self.controller.logic.get_numerical_attributes()
-            )
-        self.controller.main.comboboxes[5].delete(0, "end")
-        self.controller.main.comboboxes[5].config(state="disabled")
+            self.controller.set_values(
+                i, self.controller.logic.get_numerical_attributes())
+        self.controller.main.comboboxes[5].config(state="enabled")
+        self.controller.set_values(
+            5, ["All"] + self.controller.logic.get_flight_class())
+        self.controller.main.comboboxes[5].current(newindex=0)
         self.controller.main.type["state"] = "active"
         self.controller.main.type.set_button(1, "state", "disabled")
         self.controller.main.type.children["!radiobutton2"].invoke()
@@ -379,17 +770,29 @@ class CorrelationState(ControllerState):
 
     def get_graph(self):
         """Refer to ControllerState.get_graph"""
-        var1 = self.controller.main.comboboxes[3].get()
-        var2 = self.controller.main.comboboxes[4].get()
-        if var1 not in self.controller.main.comboboxes[3]["values"]:
-            self.controller.raise_invalid_message("Invalid attribute")
-        if var2 not in self.controller.main.comboboxes[4]["values"]:
-            self.controller.raise_invalid_message("Invalid attribute")
-        self.controller.logic.get_correlation_graph(var1, var2)
+        f_class = self.controller.main.comboboxes[5].get()
+        if f_class not in self.controller.suggestions[5]:
+            self.controller.raise_invalid_message("Invalid class")
+            return
+        f_class = None if f_class == "All" else f_class
+        graph = self.controller.main.type.var.get()
+        if graph in (3, 4):
+            method = "pearson" if graph == 3 else "spearman"
+            self.controller.logic.get_correlation_heatmap(method, f_class)
+            mode = 7
+        else:
+            var1 = self.controller.main.comboboxes[3].get()
+            var2 = self.controller.main.comboboxes[4].get()
+            if var1 not in self.controller.suggestions[3] or \
+                    var2 not in self.controller.suggestions[4]:
+                self.controller.raise_invalid_message("Invalid attribute")
+                return
+            self.controller.logic.get_correlation_graph(var1, var2, f_class)
+            mode = 6
         self.controller.main.text_boxes[1].config(state="normal")
         self.controller.main.text_boxes[1].delete(1.0, "end")
         self.controller.main.text_boxes[1].insert(
-            tk.END, self.controller.logic.describe_statistics(mode=6))
+            tk.END, self.controller.logic.describe_statistics(mode=mode))
         self.controller.main.text_boxes[1].config(state="disabled")
 
     def update_component_values(self):
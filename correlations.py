@@ -0,0 +1,67 @@
+"""Correlation matrices of the numerical columns of the flight dataframe"""
+import numpy as np
+import pandas as pd
+
+METHODS = ("pearson", "spearman")
+
+
+def get_correlations(df, columns, method="pearson"):
+    """
+    Computes the correlation of every pair of columns in one pass over the
+    rows, from the product of the centered columns with themselves
+
+    :param df: A dataframe of flights
+    :param columns: A list of numerical columns
+    :param method: optional. "pearson", or "spearman" to correlate the
+     ranks of the values
+    :return: A dataframe of the correlation coefficients indexed by column
+     on both axes
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown correlation method {method}")
+    values = np.column_stack([df[column].to_numpy(dtype=np.float64)
+                              for column in columns])
+    # rows with a missing value are left out of every pair
+    values = values[~np.isnan(values).any(axis=1)]
+    if method == "spearman":
+        values = pd.DataFrame(values).rank().to_numpy()
+    centered = values - values.mean(axis=0)
+    products = centered.T @ centered
+    scale = np.sqrt(np.diag(products))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matrix = products / np.outer(scale, scale)
+    # a column is perfectly correlated with itself even if it is constant
+    np.fill_diagonal(matrix, 1.0)
+    return pd.DataFrame(np.clip(matrix, -1, 1), index=columns,
+                        columns=columns)
+
+
+class CorrelationCache:
+    """
+    The correlation matrices of the dataset asked for so far, for each
+    method and ticket class. The matrices are kept until the data changes.
+    """
+    def __init__(self):
+        self.matrices = {}
+
+    def get(self, df, columns, method="pearson", f_class=None):
+        """
+        Gets the correlation matrix of the rows of a ticket class
+
+        :param df: A dataframe of flights
+        :param columns: A list of numerical columns
+        :param method: optional. "pearson" or "spearman"
+        :param f_class: optional. A string of the ticket class, every row if
+         not given
+        :return: A dataframe from get_correlations
+        """
+        key = (method, f_class, tuple(columns))
+        if key not in self.matrices:
+            if f_class is not None:
+                df = df[df["class"] == f_class]
+            self.matrices[key] = get_correlations(df, columns, method)
+        return self.matrices[key]
+
+    def clear(self):
+        """Forgets every matrix, for when the data changes"""
+        self.matrices.clear()
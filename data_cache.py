@@ -0,0 +1,223 @@
+"""Binary columnar cache for the flight dataset"""
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from schema import apply_schema
+
+# version 3 stores the price cube of a partition or store as npz
+CACHE_VERSION = 3
+META_FILE = "meta.json"
+
+
+def get_cache_dir(path):
+    """
+    Gets the cache directory used for a dataset
+
+    :param path: A string of the path to the csv file
+    :return: A string of the path to the cache directory
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(os.path.dirname(path), ".cache", name)
+
+
+def hash_file(path):
+    """
+    Hashes the contents of a file
+
+    :param path: A string of the path to the file
+    :return: A string of the sha256 hex digest of the file
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_dataset(path, cache_dir=None):
+    """
+    Loads a flight dataset, building the binary cache on the first run
+
+    :param path: A string of the path to the csv file
+    :param cache_dir: optional. A string of the directory to store the cache in
+    :return: A dataframe backed by memory-mapped columns
+    """
+    if cache_dir is None:
+        cache_dir = get_cache_dir(path)
+    meta = read_meta(cache_dir)
+    if meta is None or not is_cache_valid(meta, path, cache_dir):
+        df = apply_schema(pd.read_csv(path))
+        write_cache(df, cache_dir, source_stats(path))
+        meta = read_meta(cache_dir)
+    return read_cache(cache_dir, meta)
+
+
+def source_stats(path):
+    """
+    Gets the values used to invalidate the cache of a file
+
+    :param path: A string of the path to the csv file
+    :return: A dictionary of the size, mtime and hash of the file
+    """
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "sha256": hash_file(path)}
+
+
+def read_meta(cache_dir):
+    """
+    Reads the metadata of a cache
+
+    :param cache_dir: A string of the cache directory
+    :return: A dictionary of the metadata or None if there is no usable cache
+    """
+    try:
+        with open(os.path.join(cache_dir, META_FILE)) as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != CACHE_VERSION:
+        return None
+    return meta
+
+
+def is_cache_valid(meta, path, cache_dir):
+    """
+    Checks whether a cache still matches its source file.
+    The file is only hashed when its size matches but its mtime does not.
+
+    :param meta: A dictionary of the cache's metadata
+    :param path: A string of the path to the csv file
+    :param cache_dir: A string of the cache directory
+    :return: True if the cache can be used
+    """
+    stat = os.stat(path)
+    source = meta["source"]
+    if stat.st_size != source["size"]:
+        return False
+    if stat.st_mtime_ns == source["mtime_ns"]:
+        return True
+    if hash_file(path) != source["sha256"]:
+        return False
+    # the file was only touched, remember the new mtime to skip hashing
+    source["mtime_ns"] = stat.st_mtime_ns
+    write_meta(cache_dir, meta)
+    return True
+
+
+def write_meta(cache_dir, meta):
+    """
+    Writes the metadata of a cache
+
+    :param cache_dir: A string of the cache directory
+    :param meta: A dictionary of the metadata to write
+    """
+    temp = os.path.join(cache_dir, META_FILE + ".tmp")
+    with open(temp, "w") as file:
+        json.dump(meta, file, indent=1)
+    os.replace(temp, os.path.join(cache_dir, META_FILE))
+
+
+def get_code_dtype(n_categories):
+    """
+    Gets the integer type pandas uses for the codes of a categorical,
+    so mapped codes can be used without pandas copying them
+
+    :param n_categories: An integer of the number of categories
+    :return: A numpy dtype for the codes
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def encode_column(series):
+    """
+    Converts a column into a typed array that can be written to disk.
+    Categorical and string columns are stored as integer codes.
+
+    :param series: A series to encode
+    :return: A tuple of the array and the list of categories or None
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories.tolist()
+    if pd.api.types.is_numeric_dtype(series) or \
+            pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(), None
+    codes, categories = pd.factorize(series, use_na_sentinel=True)
+    return (codes.astype(get_code_dtype(len(categories))),
+            [str(value) for value in categories])
+
+
+def write_cache(df, cache_dir, source):
+    """
+    Writes a dataframe to the cache as one raw binary file per column
+
+    :param df: A dataframe to store
+    :param cache_dir: A string of the cache directory
+    :param source: A dictionary of the source file's size, mtime and hash
+    """
+    temp_dir = cache_dir + ".tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    columns = []
+    for position, name in enumerate(df.columns):
+        values, categories = encode_column(df[name])
+        file_name = f"{position}.bin"
+        np.ascontiguousarray(values).tofile(os.path.join(temp_dir, file_name))
+        columns.append({"name": name, "file": file_name,
+                        "dtype": values.dtype.str, "categories": categories,
+                        "categorical": isinstance(df[name].dtype,
+                                                  pd.CategoricalDtype)})
+    meta = {"version": CACHE_VERSION, "source": source, "rows": len(df),
+            "columns": columns}
+    write_meta(temp_dir, meta)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(temp_dir, cache_dir)
+
+
+def map_column(cache_dir, column, rows):
+    """
+    Memory maps a single column of the cache
+
+    :param cache_dir: A string of the cache directory
+    :param column: A dictionary of the column's metadata
+    :param rows: An integer of the number of rows in the column
+    :return: A read-only array of the column's values
+    """
+    dtype = np.dtype(column["dtype"])
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    values = np.memmap(os.path.join(cache_dir, column["file"]), dtype=dtype,
+                       mode="r", shape=(rows,))
+    return values.view(np.ndarray)
+
+
+def read_cache(cache_dir, meta):
+    """
+    Builds a dataframe from the cache without parsing any text
+
+    :param cache_dir: A string of the cache directory
+    :param meta: A dictionary of the cache's metadata
+    :return: A dataframe of the cached data
+    """
+    data = {}
+    for column in meta["columns"]:
+        values = map_column(cache_dir, column, meta["rows"])
+        if column["categories"] is None:
+            data[column["name"]] = pd.Series(values, copy=False)
+        elif column["categorical"]:
+            data[column["name"]] = pd.Series(pd.Categorical.from_codes(
+                values, column["categories"]), copy=False)
+        else:
+            categories = pd.Series(column["categories"])
+            decoded = categories.take(values).reset_index(drop=True)
+            missing = values < 0
+            if missing.any():
+                decoded[missing] = None
+            data[column["name"]] = decoded
+    return pd.DataFrame(data, copy=False)
@@ -0,0 +1,157 @@
+"""A linear model of flight prices fitted with NumPy"""
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# columns one-hot encoded as features
+CATEGORICAL = ["airline", "source_city", "destination_city", "departure_time",
+               "arrival_time", "stops", "class"]
+NUMERICAL = ["days_left", "duration"]
+MODEL_FILE = "fare_model.npz"
+# rows turned into features at a time while fitting
+CHUNK_ROWS = 100_000
+
+
+class FareModel:
+    """
+    Ridge regression of the log of the price on one-hot encoded categories
+    and the days left and duration.
+
+    The model keeps the normal equations, the products of the feature
+    matrix with itself and with the targets, instead of the feature matrix,
+    so rows added later are learned without going over the earlier rows and
+    the coefficients are solved again in a single small linear system.
+    The numerical columns are penalized as if they were standardized.
+    """
+    def __init__(self, categories, alpha=1.0):
+        # the values of each categorical column, fixed when the model is
+        # created so features always line up, unseen values encode as zeros
+        self.categories = categories
+        self.alpha = alpha
+        width = self.get_width()
+        self.gram = np.zeros((width, width))
+        self.moment = np.zeros(width)
+        self.rows = 0
+        self.coefficients = None
+
+    @classmethod
+    def from_frame(cls, df, alpha=1.0):
+        """
+        Creates a model fitted to the rows of a dataframe
+
+        :param df: A dataframe of flights
+        :param alpha: optional. A float of the strength of the penalty
+        :return: A FareModel
+        """
+        categories = {column: df[column].cat.categories.tolist()
+                      for column in CATEGORICAL}
+        model = cls(categories, alpha)
+        model.partial_fit(df)
+        return model
+
+    def get_width(self):
+        """
+        Gets the number of features, counting the intercept
+
+        :return: An integer of the number of features
+        """
+        return (1 + sum(len(values) for values in self.categories.values()) +
+                len(NUMERICAL))
+
+    def get_features(self, df):
+        """
+        Encodes rows as a feature matrix
+
+        :param df: A dataframe with the model's columns
+        :return: A 2D array with one row per row of df, the intercept first
+        """
+        features = np.zeros((len(df), self.get_width()))
+        features[:, 0] = 1
+        rows = np.arange(len(df))
+        start = 1
+        for column in CATEGORICAL:
+            values = self.categories[column]
+            codes = pd.Index(values).get_indexer(df[column])
+            known = codes >= 0
+            features[rows[known], start + codes[known]] = 1
+            start += len(values)
+        for column in NUMERICAL:
+            features[:, start] = df[column].to_numpy(dtype=np.float64)
+            start += 1
+        return features
+
+    def partial_fit(self, df):
+        """
+        Learns the rows of a dataframe and solves the coefficients again
+
+        :param df: A dataframe of flights
+        """
+        for begin in range(0, len(df), CHUNK_ROWS):
+            chunk = df.iloc[begin:begin + CHUNK_ROWS]
+            features = self.get_features(chunk)
+            target = np.log(chunk.price.to_numpy(dtype=np.float64))
+            self.gram += features.T @ features
+            self.moment += features.T @ target
+            self.rows += len(chunk)
+        self.solve()
+
+    def solve(self):
+        """Solves the normal equations for the coefficients"""
+        if self.rows == 0:
+            return
+        penalty = np.ones(self.get_width())
+        penalty[0] = 0
+        # the variance of a numerical column, from its sum and sum of squares
+        sums = self.gram[0, -len(NUMERICAL):]
+        squares = np.diag(self.gram)[-len(NUMERICAL):]
+        variance = squares / self.rows - (sums / self.rows) ** 2
+        penalty[-len(NUMERICAL):] = np.maximum(variance, 1e-12)
+        # lstsq copes with columns that never occur, such as a category
+        # without flights
+        system = self.gram + self.alpha * np.diag(penalty)
+        self.coefficients = np.linalg.lstsq(system, self.moment,
+                                            rcond=None)[0]
+
+    def predict(self, df):
+        """
+        Predicts the price of many bookings at once
+
+        :param df: A dataframe with the model's columns, such as
+         hypothetical bookings
+        :return: An array of the predicted prices in rupees
+        """
+        return np.exp(self.get_features(df) @ self.coefficients)
+
+    def save(self, directory):
+        """
+        Writes the model to a directory
+
+        :param directory: A string of the directory to write to
+        """
+        temp = os.path.join(directory, "fare_model.tmp.npz")
+        np.savez(temp, gram=self.gram, moment=self.moment,
+                 coefficients=self.coefficients,
+                 meta=json.dumps({"categories": self.categories,
+                                  "alpha": self.alpha, "rows": self.rows}))
+        os.replace(temp, os.path.join(directory, MODEL_FILE))
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Reads a model written by save
+
+        :param directory: A string of the directory to read from
+        :return: A FareModel, None if there is no saved model
+        """
+        try:
+            with np.load(os.path.join(directory, MODEL_FILE)) as data:
+                meta = json.loads(str(data["meta"]))
+                model = cls(meta["categories"], meta["alpha"])
+                model.gram = data["gram"]
+                model.moment = data["moment"]
+                model.coefficients = data["coefficients"]
+        except (OSError, KeyError, ValueError):
+            return None
+        model.rows = meta["rows"]
+        return model
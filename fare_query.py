@@ -0,0 +1,111 @@
+"""Cheapest fare search over the flight dataframe"""
+import numpy as np
+
+# columns shown for each fare found
+FARE_COLUMNS = ["airline", "flight", "class", "departure_time", "stops",
+                "arrival_time", "duration", "days_left", "price"]
+# rows checked against the filters before the scan widens
+MIN_CHUNK = 1024
+
+
+class FareIndex:
+    """
+    Row positions of every route, and every route and class, sorted by
+    price. A route is sorted the first time it is searched, after which a
+    search only walks its cheapest rows until enough of them pass the
+    filters, so finding the cheapest fares never sorts the matches.
+    """
+    def __init__(self):
+        # (source, end, class) to the sorted positions of the route
+        self.sorted = {}
+
+    def get_sorted(self, df, routes, source, end, f_class=None):
+        """
+        Gets the rows of a route sorted by price
+
+        :param df: The dataframe the positions point into
+        :param routes: A RouteIndex of df
+        :param source: A string of the departure city
+        :param end: A string of the arrival city
+        :param f_class: optional. A string of the ticket class
+        :return: An array of row positions, cheapest first and rows of the
+         same price in dataset order
+        """
+        key = (source, end, f_class)
+        positions = routes.get_positions(source, end, f_class)
+        # the index may already hold rows being appended after df
+        positions = positions[:np.searchsorted(positions, len(df))]
+        # rows are only ever appended, so the number of rows of the route
+        # tells if a search on another thread sorted it before an append
+        ordered = self.sorted.get(key)
+        if ordered is None or len(ordered) != len(positions):
+            prices = df.price.to_numpy()[positions]
+            ordered = positions[np.argsort(prices, kind="stable")]
+            self.sorted[key] = ordered
+        return ordered
+
+    def search(self, df, routes, source, end, f_class=None, days=None,
+               airlines=None, stops=None, count=10):
+        """
+        Finds the cheapest fares of a route
+
+        :param df: The dataframe to search
+        :param routes: A RouteIndex of df
+        :param source: A string of the departure city
+        :param end: A string of the arrival city
+        :param f_class: optional. A string of the ticket class, any class if
+         not given
+        :param days: optional. A tuple of the fewest and most days left
+         before departure
+        :param airlines: optional. A list of the airlines to include
+        :param stops: optional. A list of the numbers of stops to include
+        :param count: optional. An integer of the number of fares to find
+        :return: An array of the row positions of the fares, cheapest first
+        """
+        positions = self.get_sorted(df, routes, source, end, f_class)
+        filters = []
+        if days is not None:
+            filters.append((df.days_left.to_numpy(), days))
+        for column, values in (("airline", airlines), ("stops", stops)):
+            if values is not None:
+                codes = df[column].cat.categories.get_indexer(values)
+                filters.append((df[column].cat.codes.to_numpy(),
+                                codes[codes >= 0]))
+        if not filters:
+            return positions[:count]
+        found = []
+        total = 0
+        start = 0
+        size = max(4 * count, MIN_CHUNK)
+        while start < len(positions) and total < count:
+            chunk = positions[start:start + size]
+            mask = np.ones(len(chunk), dtype=bool)
+            for values, accepted in filters:
+                values = values[chunk]
+                if isinstance(accepted, tuple):
+                    mask &= (values >= accepted[0]) & (values <= accepted[1])
+                else:
+                    mask &= np.isin(values, accepted)
+            found.append(chunk[mask])
+            total += len(found[-1])
+            start += size
+            # few rows pass the filters, look further ahead next time
+            size *= 2
+        if not found:
+            return positions[:0]
+        return np.concatenate(found)[:count]
+
+    def clear(self):
+        """Forgets every sorted route, for when the data is replaced"""
+        self.sorted.clear()
+
+    def invalidate(self, routes):
+        """
+        Forgets the sorted rows of routes that gained rows
+
+        :param routes: A set of (source, destination) tuples
+        """
+        # a search on a worker thread may add a route meanwhile, so iterate
+        # over a copy of the keys
+        for key in [key for key in list(self.sorted) if key[:2] in routes]:
+            self.sorted.pop(key, None)
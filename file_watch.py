@@ -0,0 +1,121 @@
+"""Watches flight data files for new rows"""
+import glob
+import io
+import os
+import pandas as pd
+from schema import FLIGHT_SCHEMA, apply_schema
+
+
+class FileWatcher:
+    """
+    Reads the rows added to a csv file, or the csv files added to a
+    directory, since the watch started.
+
+    A watched file is expected to grow by appending lines, and only whole
+    lines are read, so a line still being written waits for the next
+    check. Files in a watched directory are read once their size has not
+    changed between two checks, and a file that cannot be read as flight
+    data is skipped.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.directory = os.path.isdir(path)
+        if self.directory:
+            self.seen = set(self.list_files())
+            self.sizes = {}
+        else:
+            with open(path, "rb") as file:
+                self.header = file.readline()
+            self.offset = os.path.getsize(path)
+
+    def list_files(self):
+        """
+        Lists the csv files of the watched directory
+
+        :return: A sorted list of paths
+        """
+        return sorted(glob.glob(os.path.join(self.path, "*.csv")))
+
+    def check(self):
+        """
+        Reads the rows added since the last check
+
+        :return: A dataframe of the new rows, None if there are none
+        """
+        frames = self.check_directory() if self.directory else self.check_file()
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return None
+        return apply_schema(pd.concat(frames, ignore_index=True))
+
+    def check_file(self):
+        """
+        Reads the whole lines appended to the watched file
+
+        :return: A list of dataframes
+        """
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            # the file was replaced rather than appended to, there is no
+            # way to tell which rows are new so start over from its end
+            self.offset = size
+            return []
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as file:
+            file.seek(self.offset)
+            data = file.read(size - self.offset)
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return []
+        self.offset += end
+        return [pd.read_csv(io.BytesIO(self.header + data[:end]))]
+
+    def check_directory(self):
+        """
+        Reads the csv files added to the watched directory
+
+        :return: A list of dataframes
+        """
+        frames = []
+        for path in self.list_files():
+            if path in self.seen:
+                continue
+            try:
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                # removed since the directory was listed
+                self.sizes.pop(path, None)
+                continue
+            if self.sizes.get(path) != size:
+                # the file may still be being written
+                self.sizes[path] = size
+                continue
+            del self.sizes[path]
+            self.seen.add(path)
+            try:
+                frames.append(self.read_flights(path))
+            except FileNotFoundError:
+                self.seen.discard(path)
+            except ValueError:
+                # a malformed file is left out rather than the whole batch,
+                # ParserError, missing columns and the schema's range check
+                # are ValueErrors
+                continue
+        return frames
+
+    @staticmethod
+    def read_flights(path):
+        """
+        Reads a csv file of flights
+
+        :param path: A string of the path to the csv file
+        :return: A dataframe with the declared column types
+        :raises ValueError: if the file is not flight data
+        """
+        df = pd.read_csv(path)
+        missing = set(FLIGHT_SCHEMA) - set(df.columns)
+        if missing:
+            raise ValueError(f"{path} has no {', '.join(sorted(missing))} "
+                             f"column")
+        return apply_schema(df)
@@ -0,0 +1,205 @@
+"""Grouped descriptive statistics for the flight dataframe"""
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+QUANTILES = (0.25, 0.5, 0.75)
+# number of results kept for reuse
+CACHE_SIZE = 256
+# largest number of combinations of categorical keys to count directly
+MAX_CELLS = 10**7
+
+
+def describe_groups(df, keys, value="price", quantiles=QUANTILES):
+    """
+    Computes the count, mean, standard deviation, min, quantiles and max of
+    a column for every group of some key columns. The values are sorted
+    once by group and value, and every statistic is read off that order
+    instead of filtering the dataframe for each group.
+
+    :param df: A dataframe to describe
+    :param keys: A list of the columns to group by, empty for the whole
+     dataframe
+    :param value: optional. A string of the column to describe
+    :param quantiles: optional. A tuple of the quantiles to compute
+    :return: A dataframe with one row per group, in the order groupby sorts
+     the groups, and the same columns as DataFrame.describe
+    """
+    columns = (["count", "mean", "std", "min"] +
+               [f"{q:.0%}" for q in quantiles] + ["max"])
+    values = df[value].to_numpy(dtype=np.float64)
+    codes, index = get_group_codes(df, keys)
+    # missing keys get the code -1 and missing values are not counted
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes = codes[valid]
+    values = values[valid]
+    groups = len(index)
+    counts = np.bincount(codes, minlength=groups)
+    # sort by value, then stable sort by group, which numpy does as a
+    # radix sort when the group codes are small integers
+    order = np.argsort(values)
+    order = order[np.argsort(codes[order].astype(
+        np.min_scalar_type(max(groups - 1, 0))), kind="stable")]
+    ordered = values[order]
+    starts = np.cumsum(counts) - counts
+    present = counts > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sums = np.bincount(codes, weights=values, minlength=groups)
+        means = sums / counts
+        squares = np.bincount(codes, weights=(values - means[codes]) ** 2,
+                              minlength=groups)
+        stds = np.sqrt(squares / (counts - 1))
+    result = {"count": counts, "mean": means, "std": stds}
+    result["min"] = np.full(groups, np.nan)
+    result["min"][present] = ordered[starts[present]]
+    for q in quantiles:
+        # linear interpolation between the closest ranks, like pandas
+        position = starts + q * np.maximum(counts - 1, 0)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, starts + counts - 1)
+        quantile = np.full(groups, np.nan)
+        if present.any():
+            fraction = (position - low)[present]
+            below = ordered[low[present]]
+            above = ordered[high[present]]
+            quantile[present] = below + (above - below) * fraction
+        result[f"{q:.0%}"] = quantile
+    result["max"] = np.full(groups, np.nan)
+    result["max"][present] = ordered[(starts + counts - 1)[present]]
+    return pd.DataFrame(result, index=index, columns=columns)
+
+
+def get_group_codes(df, keys):
+    """
+    Numbers the groups of some key columns in sorted order
+
+    :param df: A dataframe to group
+    :param keys: A list of the columns to group by, empty for the whole
+     dataframe
+    :return: A tuple of an array of the group of every row, -1 for rows
+     with a missing key, and an index of the group keys
+    """
+    if not keys:
+        return (np.zeros(len(df), dtype=np.int64),
+                pd.Index(["all"] if len(df) else []))
+    columns = [df[key] for key in keys]
+    sizes = [len(column.cat.categories)
+             if isinstance(column.dtype, pd.CategoricalDtype) else 0
+             for column in columns]
+    if 0 in sizes or np.prod(sizes, dtype=np.float64) > MAX_CELLS:
+        grouped = df.groupby(keys, observed=True)
+        return grouped.ngroup().to_numpy(), grouped.size().index
+    # categorical keys already are integer codes, so the groups can be
+    # numbered by counting combinations of codes instead of hashing keys
+    combined = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    for column, size in zip(columns, sizes):
+        category = column.cat.codes.to_numpy()
+        missing |= category < 0
+        combined = combined * size + category
+    combined[missing] = 0
+    present = np.bincount(combined[~missing],
+                          minlength=int(np.prod(sizes))) > 0
+    cells = np.flatnonzero(present)
+    numbers = np.cumsum(present) - 1
+    codes = np.where(missing, -1, numbers[combined])
+    arrays = []
+    for column, size in zip(reversed(columns), reversed(sizes)):
+        arrays.append(column.cat.categories.take(cells % size))
+        cells = cells // size
+    arrays.reverse()
+    if len(keys) == 1:
+        return codes, pd.Index(arrays[0], name=keys[0])
+    return codes, pd.MultiIndex.from_arrays(arrays, names=keys)
+
+
+def format_table(result, columns, headers=None, formats=None):
+    """
+    Formats statistics as a table with a column for the group keys
+
+    :param result: A dataframe from describe_groups
+    :param columns: A list of the statistics to show
+    :param headers: optional. A list of the headings of the key column and
+     the statistics, the column names by default
+    :param formats: optional. A dictionary of statistics to format specs
+    :return: A formatted string of the table
+    """
+    if headers is None:
+        headers = [" / ".join(str(name) for name in result.index.names
+                              if name is not None)] + list(columns)
+    formats = formats or {}
+    labels = [" / ".join(str(part) for part in key) if isinstance(key, tuple)
+              else str(key) for key in result.index]
+    cells = [[format(value, formats.get(column, "")) for value in
+              result[column]] for column in columns]
+    widths = [max([len(headers[0])] + [len(label) for label in labels])]
+    widths += [max([len(header)] + [len(cell) for cell in column])
+               for header, column in zip(headers[1:], cells)]
+    lines = ["  ".join([headers[0].ljust(widths[0])] +
+                       [header.rjust(width) for header, width in
+                        zip(headers[1:], widths[1:])])]
+    for row, label in enumerate(labels):
+        lines.append("  ".join([label.ljust(widths[0])] +
+                               [column[row].rjust(width) for column, width
+                                in zip(cells, widths[1:])]))
+    return "\n".join(lines)
+
+
+class GroupedStats:
+    """
+    Grouped statistics of the model's selections, kept for reuse.
+
+    Results are cached by the selection the rows come from, their number,
+    the group keys and the described column, so asking again for the
+    statistics of a route or flight does not touch the dataframe. Queries
+    on worker threads share the cache, so it is only changed while holding
+    a lock.
+    """
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, selection, df, keys, value="price"):
+        """
+        Gets the statistics of the groups of a selection
+
+        :param selection: A tuple identifying the rows of df, such as the
+         model's selection
+        :param df: A dataframe of the selected rows
+        :param keys: A list of the columns to group by
+        :param value: optional. A string of the column to describe
+        :return: A dataframe from describe_groups
+        """
+        # rows are only ever appended, so a result a worker thread computed
+        # from the rows before an append is told apart by their count
+        key = (selection, tuple(keys), value, len(df))
+        with self.lock:
+            if key in self.results:
+                self.results.move_to_end(key)
+                return self.results[key]
+        # computed outside the lock, two threads asking for the same new
+        # result both compute it and the last one is kept
+        result = describe_groups(df, list(keys), value)
+        with self.lock:
+            self.results[key] = result
+            while len(self.results) > self.size:
+                self.results.popitem(last=False)
+        return result
+
+    def clear(self):
+        """Forgets every result, for when the data changes"""
+        with self.lock:
+            self.results.clear()
+
+    def invalidate(self, is_affected):
+        """
+        Forgets the results of the selections whose rows changed
+
+        :param is_affected: A function that takes a selection and returns
+         True if its rows changed
+        """
+        with self.lock:
+            for key in [key for key in self.results if is_affected(key[0])]:
+                del self.results[key]
@@ -0,0 +1,74 @@
+"""Pre-binned price histograms for the flight dataframe"""
+import numpy as np
+
+PRICE_BINS = 60
+
+
+class PriceHistograms:
+    """
+    Price counts in log-spaced bins for every (route, class), binned the
+    first time a route is asked for and reused afterwards
+    """
+    def __init__(self, df, routes, bins=PRICE_BINS):
+        self.prices = df.price.to_numpy()
+        self.routes = routes
+        self.bins = bins
+        self.edges = self.get_edges(self.prices, bins)
+        self.counts = {}
+
+    @staticmethod
+    def get_edges(prices, bins):
+        """
+        Gets log-spaced bin edges covering every price
+
+        :param prices: An array of prices
+        :param bins: An integer of the number of bins
+        :return: An array of bins + 1 edges
+        """
+        low = max(prices.min(), 1) if len(prices) else 1
+        high = max(prices.max(), low + 1) if len(prices) else 2
+        return np.geomspace(low, high, bins + 1)
+
+    def update(self, df, routes):
+        """
+        Forgets the histograms of routes that gained rows. Every histogram
+        is forgotten if the new prices fall outside the bins.
+
+        :param df: The dataframe with the new rows added
+        :param routes: A set of (source, destination) tuples that gained rows
+        """
+        new = df.price.to_numpy()[len(self.prices):]
+        self.prices = df.price.to_numpy()
+        if len(new) and (new.min() < self.edges[0] or
+                         new.max() > self.edges[-1]):
+            self.edges = self.get_edges(self.prices, self.bins)
+            self.counts = {}
+            return
+        self.counts = {key: counts for key, counts in self.counts.items()
+                       if key[:2] not in routes}
+
+    def get_counts(self, source, end, f_class):
+        """
+        Gets the price histogram of a route and class
+
+        :param source: A string representing the departure airport
+        :param end: A string representing the arrival airport
+        :param f_class: A string of the ticket class
+        :return: An array of the number of flights in each price bin
+        """
+        key = (source, end, f_class)
+        if key not in self.counts:
+            prices = self.prices[self.routes.get_positions(*key)]
+            self.counts[key] = np.histogram(prices, self.edges)[0]
+        return self.counts[key]
+
+    def get_route(self, source, end):
+        """
+        Gets the price histograms of every class of a route
+
+        :param source: A string representing the departure airport
+        :param end: A string representing the arrival airport
+        :return: A dictionary of ticket classes to arrays of bin counts
+        """
+        return {f_class: self.get_counts(source, end, f_class)
+                for f_class in self.routes.get_classes(source, end)}
@@ -0,0 +1,313 @@
+"""Precomputed row indexes for the flight dataframe"""
+import json
+import os
+import numpy as np
+
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+class GroupIndex:
+    """
+    Row positions of every group of some key columns.
+
+    Each segment is an array of row positions ordered by group along with
+    the span of every group in that array and an offset added to its
+    positions. Rows that are added later become new segments, so building
+    the index never copies the older positions, and indexes of other
+    dataframes can be added without shifting their positions.
+    """
+    def __init__(self, keys, df=None):
+        self.keys = keys
+        self.segments = []
+        self.first = {}
+        if df is not None:
+            self.extend(df)
+
+    def build_segment(self, df, offset=0):
+        """
+        Groups the row positions of a dataframe in a single pass
+
+        :param df: A dataframe to index
+        :param offset: optional. An integer of the position of df's first row
+        :return: A tuple of the array of positions ordered by group and a
+         dictionary of group keys to (start, stop) spans of that array
+        """
+        if len(df) == 0:
+            return EMPTY, {}
+        codes = df.groupby(self.keys, observed=True,
+                           sort=False).ngroup().to_numpy()
+        order = np.argsort(codes, kind="stable")
+        order = order[np.count_nonzero(codes < 0):]
+        bounds = np.cumsum(np.bincount(codes[codes >= 0]))
+        starts = np.concatenate(([0], bounds[:-1])).astype(np.int64)
+        first_rows = df[self.keys].iloc[order[starts]]
+        spans = {}
+        for key, start, stop in zip(first_rows.itertuples(index=False),
+                                    starts, bounds):
+            key = key[0] if len(key) == 1 else tuple(key)
+            spans[key] = (int(start), int(stop))
+        return order.astype(np.int64) + offset, spans
+
+    def extend(self, df, offset=0):
+        """
+        Adds the rows of a dataframe to the index
+
+        :param df: A dataframe with the same key columns
+        :param offset: optional. An integer of the position of df's first row
+        """
+        self.add_segment(*self.build_segment(df, offset))
+
+    def add_segment(self, order, spans, offset=0):
+        """
+        Adds a segment built by build_segment
+
+        :param order: An array of row positions ordered by group
+        :param spans: A dictionary of group keys to spans of the array
+        :param offset: optional. An integer added to the positions of order
+        """
+        self.segments.append((order, spans, offset))
+        # keep the keys in order of their first row
+        new = sorted((order[start], key) for key, (start, _) in spans.items()
+                     if key not in self.first)
+        for position, key in new:
+            self.first[key] = int(position) + offset
+
+    def add_index(self, index, offset):
+        """
+        Adds the segments of the index of another dataframe, such as a
+        partition that is placed after the rows already indexed
+
+        :param index: A GroupIndex with the same key columns
+        :param offset: An integer of the position of the other dataframe's
+         first row
+        """
+        for order, spans, base in index.segments:
+            self.add_segment(order, spans, base + offset)
+
+    def get(self, key):
+        """
+        Gets the row positions of a group
+
+        :param key: A group key, a tuple if the index has several key columns
+        :return: A sorted array of row positions, empty if the key is unknown
+        """
+        parts = [order[spans[key][0]:spans[key][1]] + offset if offset
+                 else order[spans[key][0]:spans[key][1]]
+                 for order, spans, offset in self.segments if key in spans]
+        if not parts:
+            return EMPTY
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    def get_keys(self):
+        """
+        Gets the group keys of the index
+
+        :return: A list of group keys in order of their first row
+        """
+        return list(self.first)
+
+    def save(self, directory, name):
+        """
+        Writes the index as a single segment, one group at a time
+
+        :param directory: A string of the directory to write to
+        :param name: A string to name the index's files with
+        """
+        spans = []
+        start = 0
+        with open(os.path.join(directory, f"{name}.bin"), "wb") as file:
+            for key in self.first:
+                positions = self.get(key)
+                np.asarray(positions, dtype=np.int64).tofile(file)
+                spans.append([key, start, start + len(positions)])
+                start += len(positions)
+        with open(os.path.join(directory, f"{name}.json"), "w") as file:
+            json.dump({"keys": self.keys, "rows": start, "spans": spans},
+                      file)
+
+    @classmethod
+    def load(cls, directory, name):
+        """
+        Memory maps an index written by save
+
+        :param directory: A string of the directory to read from
+        :param name: A string of the name of the index's files
+        :return: A GroupIndex
+        """
+        with open(os.path.join(directory, f"{name}.json")) as file:
+            meta = json.load(file)
+        index = cls(meta["keys"])
+        if meta["rows"] == 0:
+            return index
+        order = np.memmap(os.path.join(directory, f"{name}.bin"),
+                          dtype=np.int64, mode="r", shape=(meta["rows"],))
+        spans = {}
+        for key, start, stop in meta["spans"]:
+            key = tuple(key) if isinstance(key, list) else key
+            spans[key] = (start, stop)
+        index.add_segment(order.view(np.ndarray), spans)
+        return index
+
+
+class RouteIndex:
+    """Row positions of every route and every (route, class) in a dataframe"""
+    def __init__(self, df=None):
+        self.routes = GroupIndex(["source_city", "destination_city"], df)
+        self.classes = GroupIndex(
+            ["source_city", "destination_city", "class"], df)
+
+    def extend(self, df, offset=0):
+        """
+        Adds the rows of a dataframe to the index
+
+        :param df: A dataframe of flights
+        :param offset: optional. An integer of the position of df's first row
+        """
+        self.routes.extend(df, offset)
+        self.classes.extend(df, offset)
+
+    def add_index(self, index, offset):
+        """
+        Adds the index of a dataframe placed after the rows already indexed
+
+        :param index: A RouteIndex
+        :param offset: An integer of the position of its first row
+        """
+        self.routes.add_index(index.routes, offset)
+        self.classes.add_index(index.classes, offset)
+
+    def save(self, directory):
+        """
+        Writes the index to a directory
+
+        :param directory: A string of the directory to write to
+        """
+        self.routes.save(directory, "routes")
+        self.classes.save(directory, "classes")
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Memory maps an index written by save
+
+        :param directory: A string of the directory to read from
+        :return: A RouteIndex
+        """
+        index = cls()
+        index.routes = GroupIndex.load(directory, "routes")
+        index.classes = GroupIndex.load(directory, "classes")
+        return index
+
+    def get_positions(self, source, end, f_class=None):
+        """
+        Gets the row positions of a route
+
+        :param source: A string representing the departure airport
+        :param end: A string representing the arrival airport
+        :param f_class: optional. A string of the ticket class to select
+        :return: A sorted array of row positions, empty if the route is unknown
+        """
+        if f_class is None:
+            return self.routes.get((source, end))
+        return self.classes.get((source, end, f_class))
+
+    def get_sources(self):
+        """
+        Gets the departure airports in order of first appearance
+
+        :return: A list of departure airports
+        """
+        sources = {}
+        for source, _ in self.routes.get_keys():
+            sources.setdefault(source, None)
+        return list(sources)
+
+    def get_destinations(self, source):
+        """
+        Gets the arrival airports of a departure airport
+
+        :param source: A string representing the departure airport
+        :return: A list of arrival airports in order of first appearance
+        """
+        return [end for start, end in self.routes.get_keys()
+                if start == source]
+
+    def get_classes(self, source=None, end=None):
+        """
+        Gets the ticket classes of a route or of the whole dataframe
+
+        :param source: optional. A string representing the departure airport
+        :param end: optional. A string representing the arrival airport
+        :return: A list of ticket classes in order of first appearance
+        """
+        classes = {}
+        for start, stop, f_class in self.classes.get_keys():
+            if source is None or (start, stop) == (source, end):
+                classes.setdefault(f_class, None)
+        return list(classes)
+
+
+class FlightIndex:
+    """Row positions of every flight code in a dataframe"""
+    def __init__(self, df=None):
+        self.flights = GroupIndex(["flight"], df)
+
+    def extend(self, df, offset=0):
+        """
+        Adds the rows of a dataframe to the index
+
+        :param df: A dataframe of flights
+        :param offset: optional. An integer of the position of df's first row
+        """
+        self.flights.extend(df, offset)
+
+    def add_index(self, index, offset):
+        """
+        Adds the index of a dataframe placed after the rows already indexed
+
+        :param index: A FlightIndex
+        :param offset: An integer of the position of its first row
+        """
+        self.flights.add_index(index.flights, offset)
+
+    def save(self, directory):
+        """
+        Writes the index to a directory
+
+        :param directory: A string of the directory to write to
+        """
+        self.flights.save(directory, "flights")
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Memory maps an index written by save
+
+        :param directory: A string of the directory to read from
+        :return: A FlightIndex
+        """
+        index = cls()
+        index.flights = GroupIndex.load(directory, "flights")
+        return index
+
+    def get_positions(self, flight_code, within=None):
+        """
+        Gets the row positions of a flight code
+
+        :param flight_code: A string of a flight code
+        :param within: optional. A sorted array of row positions to restrict
+         the result to, such as the positions of a route
+        :return: A sorted array of row positions, empty if the code is unknown
+        """
+        positions = self.flights.get(flight_code)
+        if within is None or len(positions) == 0:
+            return positions
+        if len(within) == 0:
+            return EMPTY
+        # binary search the flight's rows in the selection so the cost
+        # depends on the size of the flight, not the size of the dataset
+        found = np.searchsorted(within, positions)
+        found[found == len(within)] = 0
+        return positions[within[found] == positions]
@@ -0,0 +1,167 @@
+"""Latency measurements of the visualizer's hot paths"""
+import functools
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# number of recent calls each histogram keeps
+WINDOW = 512
+
+
+class LatencyHistogram:
+    """The durations of the most recent calls of one code path"""
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        """
+        Records the duration of a call
+
+        :param seconds: A float of the duration in seconds
+        """
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def get_stats(self):
+        """
+        Summarizes the recent calls
+
+        :return: A dictionary of the number of calls, the total time and the
+         p50, p95 and max of the recent calls in seconds
+        """
+        samples = sorted(self.samples)
+        if not samples:
+            return {"count": self.count, "total": self.total,
+                    "p50": 0.0, "p95": 0.0, "max": 0.0}
+        return {"count": self.count, "total": self.total,
+                "p50": self.get_percentile(samples, 50),
+                "p95": self.get_percentile(samples, 95),
+                "max": samples[-1]}
+
+    @staticmethod
+    def get_percentile(samples, percent):
+        """
+        Gets a percentile by the nearest rank method
+
+        :param samples: A sorted list of durations
+        :param percent: A number from 0 to 100
+        :return: A float of the duration at the percentile
+        """
+        rank = math.ceil(percent / 100 * len(samples))
+        return samples[max(rank, 1) - 1]
+
+
+class Instrumentation:
+    """
+    Rolling latency histograms of named code paths.
+
+    Calls may be recorded from the worker threads as well as the Tk thread.
+    """
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.enabled = True
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds):
+        """
+        Records the duration of a call
+
+        :param name: A string naming the code path
+        :param seconds: A float of the duration in seconds
+        """
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = LatencyHistogram(self.window)
+            self.histograms[name].add(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Times the body of a with statement
+
+        :param name: A string naming the code path
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name=None):
+        """
+        Decorates a function so every call is timed
+
+        :param name: optional. A string naming the code path, the
+         function's qualified name by default
+        :return: A decorator
+        """
+        def decorate(function):
+            label = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(label):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def get_stats(self):
+        """
+        Summarizes every code path
+
+        :return: A dictionary of code path names to their statistics
+        """
+        with self.lock:
+            return {name: histogram.get_stats()
+                    for name, histogram in self.histograms.items()}
+
+    def reset(self):
+        """Forgets every recorded call"""
+        with self.lock:
+            self.histograms = {}
+
+    def report(self):
+        """
+        Formats the statistics as a table, slowest code paths first
+
+        :return: A formatted string of the statistics in milliseconds
+        """
+        stats = sorted(self.get_stats().items(),
+                       key=lambda item: item[1]["total"], reverse=True)
+        width = max([len(name) for name, _ in stats] + [9]) + 2
+        lines = [f"{'code path':{width}}{'calls':>7}{'p50':>10}{'p95':>10}"
+                 f"{'max':>10}{'total':>11}"]
+        for name, values in stats:
+            lines.append(f"{name:{width}}{values['count']:>7}"
+                         f"{values['p50'] * 1000:>10.2f}"
+                         f"{values['p95'] * 1000:>10.2f}"
+                         f"{values['max'] * 1000:>10.2f}"
+                         f"{values['total'] * 1000:>11.1f}")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """
+        Writes the statistics to a json file
+
+        :param path: A string of the path to write to
+        """
+        with open(path, "w") as file:
+            json.dump({"time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "unit": "seconds", "window": self.window,
+                       "paths": self.get_stats()}, file, indent=2)
+
+
+# the measurements shared by the whole app
+METRICS = Instrumentation()
+timer = METRICS.timer
+timed = METRICS.timed
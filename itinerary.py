@@ -0,0 +1,152 @@
+"""Multi-leg itineraries over the routes of the flight dataframe"""
+import heapq
+import numpy as np
+
+# most flights an itinerary may take
+MAX_LEGS = 3
+# what an itinerary can be optimized for, the mean of each leg is added up
+WEIGHTS = ("price", "duration")
+
+
+class RouteGraph:
+    """
+    A graph of the cities with an edge for every route, weighted by the
+    mean price and mean duration of its flights, for each ticket class.
+    Classes are never averaged together, since such a mean is not a fare
+    anyone can buy.
+
+    The graph is built once from the dataframe. Itineraries are found by
+    Dijkstra's algorithm, and the next best ones by Yen's algorithm.
+    """
+    def __init__(self, df, routes):
+        # ticket class to a dictionary of cities to their arrival cities and
+        # the edge's (price, duration)
+        self.edges = {}
+        self.update(df, routes)
+
+    def update(self, df, routes, changed=None):
+        """
+        Computes the edges of routes from their rows
+
+        :param df: A dataframe of flights
+        :param routes: A RouteIndex of df
+        :param changed: optional. A set of the (source, destination) routes
+         to compute, every route if not given
+        """
+        prices = df.price.to_numpy()
+        durations = df.duration.to_numpy()
+        keys = [(source, end, f_class)
+                for source, end in routes.routes.get_keys()
+                for f_class in routes.get_classes(source, end)
+                if changed is None or (source, end) in changed]
+        # the edges are changed in copies and swapped in at the end, so a
+        # search on a worker thread never sees them change under it
+        edges = {f_class: dict(cities) for f_class, cities in
+                 self.edges.items()}
+        copied = set()
+        for source, end, f_class in keys:
+            positions = routes.get_positions(source, end, f_class)
+            if len(positions) == 0:
+                continue
+            price = float(np.mean(prices[positions], dtype=np.float64))
+            duration = float(np.mean(durations[positions], dtype=np.float64))
+            cities = edges.setdefault(f_class, {})
+            if (f_class, source) not in copied:
+                cities[source] = dict(cities.get(source, {}))
+                copied.add((f_class, source))
+            cities[source][end] = (price, duration)
+        self.edges = edges
+
+    def get_cost(self, path, f_class):
+        """
+        Adds up the price and duration of the legs of a path
+
+        :param path: A list of cities
+        :param f_class: A string of the ticket class
+        :return: A tuple of the total price and total duration
+        """
+        edges = self.edges.get(f_class, {})
+        legs = [edges[start][stop] for start, stop in zip(path, path[1:])]
+        return (sum(price for price, _ in legs),
+                sum(duration for _, duration in legs))
+
+    def find_path(self, source, end, f_class, weight="price",
+                  max_legs=MAX_LEGS, removed_edges=(), removed_cities=()):
+        """
+        Finds the best path between two cities with Dijkstra's algorithm,
+        counting the legs taken so the path is never longer than max_legs
+
+        :param source: A string of the departure city
+        :param end: A string of the arrival city
+        :param f_class: A string of the ticket class
+        :param weight: optional. "price" or "duration" to minimize
+        :param max_legs: optional. An integer of the most legs to take
+        :param removed_edges: optional. A set of (city, city) legs to avoid
+        :param removed_cities: optional. A set of cities to avoid
+        :return: A tuple of the cost and list of cities, None if there is no
+         path
+        """
+        column = WEIGHTS.index(weight)
+        edges = self.edges.get(f_class, {})
+        best = {(source, 0): 0.0}
+        queue = [(0.0, 0, source, [source])]
+        while queue:
+            cost, legs, city, path = heapq.heappop(queue)
+            if city == end:
+                return cost, path
+            if cost > best.get((city, legs), float("inf")) or \
+                    legs == max_legs:
+                continue
+            for stop, values in edges.get(city, {}).items():
+                if stop in removed_cities or stop in path or \
+                        (city, stop) in removed_edges:
+                    continue
+                total = cost + values[column]
+                if total < best.get((stop, legs + 1), float("inf")):
+                    best[(stop, legs + 1)] = total
+                    heapq.heappush(queue, (total, legs + 1, stop,
+                                           path + [stop]))
+        return None
+
+    def find_paths(self, source, end, f_class, weight="price", count=3,
+                   max_legs=MAX_LEGS):
+        """
+        Finds the best paths between two cities with Yen's algorithm, each
+        found by changing the route of the ones before it
+
+        :param source: A string of the departure city
+        :param end: A string of the arrival city
+        :param f_class: A string of the ticket class
+        :param weight: optional. "price" or "duration" to minimize
+        :param count: optional. An integer of the number of paths to find
+        :param max_legs: optional. An integer of the most legs to take
+        :return: A list of (cost, list of cities) tuples, best first
+        """
+        first = self.find_path(source, end, f_class, weight, max_legs)
+        if first is None or source == end:
+            return []
+        paths = [first]
+        candidates = []
+        seen = {tuple(first[1])}
+        column = WEIGHTS.index(weight)
+        while len(paths) < count:
+            last = paths[-1][1]
+            for i in range(len(last) - 1):
+                root = last[:i + 1]
+                # legs already taken from this root must not be found again
+                removed = {(path[i], path[i + 1]) for _, path in paths
+                           if path[:i + 1] == root}
+                spur = self.find_path(root[-1], end, f_class, weight,
+                                      max_legs - i, removed, set(root[:-1]))
+                if spur is None:
+                    continue
+                path = root[:-1] + spur[1]
+                if tuple(path) in seen:
+                    continue
+                seen.add(tuple(path))
+                heapq.heappush(candidates,
+                               (self.get_cost(path, f_class)[column], path))
+            if not candidates:
+                break
+            paths.append(heapq.heappop(candidates))
+        return paths
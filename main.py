@@ -1,14 +1,143 @@
-import pandas as pd
-from visualizer_ui import VisualizerUI
-from model_logic import DataframeLogic
-from controllers import Controller
-import os
+import time
+# taken before the other imports so the startup times include them
+STARTED = time.perf_counter()
+import argparse  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
+from visualizer_ui import (VisualizerUI, set_backend,  # noqa: E402
+                           import_plotting)
+from controllers import Controller  # noqa: E402
+from workers import BackgroundWorker  # noqa: E402
+from instrumentation import METRICS  # noqa: E402
+
+
+def load_model(path, stream=False, window=None):
+    """
+    Loads the dataset and builds the model, runs in a worker thread while
+    the window is already shown
+
+    :param path: A string of the path to the flight data csv, or to a
+     directory of partition csv files
+    :param stream: optional. True to open the on-disk store of the dataset
+    :param window: optional. A tuple of the first and last date of the
+     partitions to load
+    :return: A tuple of a DataframeLogic and the PartitionedDataset, None
+     if the dataset is a single file
+    """
+    # pandas is imported here instead of at the top so the window does not
+    # wait for it
+    from model_logic import DataframeLogic
+    partitions = None
+    if os.path.isdir(path):
+        from partitions import PartitionedDataset
+        partitions = PartitionedDataset(path)
+        model = DataframeLogic(**partitions.open(window))
+    elif stream:
+        from streaming import load_store, get_store_dir
+        model = DataframeLogic(**load_store(path),
+                               model_dir=get_store_dir(path))
+    else:
+        from data_cache import load_dataset, get_cache_dir
+        model = DataframeLogic(load_dataset(path),
+                               model_dir=get_cache_dir(path))
+    # import the plotting stack before the first graph needs it, the
+    # backend was selected on the Tk thread
+    import_plotting()
+    return model, partitions
+
+
+def record_startup(stage):
+    """
+    Records how long after the start of the program a startup stage ended
+
+    :param stage: A string naming the stage
+    :return: A float of the seconds since the program started
+    """
+    elapsed = time.perf_counter() - STARTED
+    METRICS.record(f"startup {stage}", elapsed)
+    return elapsed
 
 
 if __name__ == "__main__":
-    orig_df = pd.read_csv(os.path.join(os.getcwd(), "Datasets",
-                                       "Indian Airlines.csv"))
-    model = DataframeLogic(orig_df)
+    parser = argparse.ArgumentParser(description="Indian flight visualizer")
+    parser.add_argument("dataset", nargs="?",
+                        default=os.path.join(os.getcwd(), "Datasets",
+                                             "Indian Airlines.csv"),
+                        help="path to the flight data csv, or to a "
+                             "directory of csv files with one partition each")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream the csv into an on-disk store instead "
+                             "of loading it into memory")
+    parser.add_argument("--window", nargs=2, metavar=("START", "END"),
+                        help="load only the partitions dated from START to "
+                             "END, as YYYY-MM-DD")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="write the latency of the app's hot paths to "
+                             "a json file on exit")
+    parser.add_argument("--watch", nargs="?", const="", metavar="PATH",
+                        help="add rows appended to the dataset, or to the "
+                             "csv file or directory given, while running")
+    parser.add_argument("--measure-startup", action="store_true",
+                        help="print the cold start times and exit once the "
+                             "first graph is drawn")
+    args = parser.parse_args()
+    if os.path.isdir(args.dataset) and args.stream:
+        parser.error("--stream reads a single csv file")
+    if args.window and not os.path.isdir(args.dataset):
+        parser.error("--window needs a directory of partitions")
+    if (os.path.isdir(args.dataset) and args.watch and
+            os.path.abspath(args.watch) != os.path.abspath(args.dataset)):
+        parser.error("--watch of a directory of partitions watches the "
+                     "directory itself")
+    window = tuple(sorted(args.window)) if args.window else None
     ui = VisualizerUI()
-    controller = Controller(ui, model)
-    controller.main.run()
+    worker = BackgroundWorker(ui, on_busy=ui.set_busy)
+    controllers = []
+    errors = []
+
+    def fail(error):
+        """
+        Closes the window when the model could not be loaded, instead of
+        leaving it empty
+
+        :param error: The exception loading the model raised
+        """
+        errors.append(error)
+        ui.quit()
+
+    def start(result):
+        """
+        Connects the model to the window once it has loaded
+
+        :param result: A tuple of the DataframeLogic and PartitionedDataset
+        """
+        loaded = record_startup("data loaded")
+        model, partitions = result
+        try:
+            controllers.append(Controller(ui, model, worker))
+            if partitions is not None:
+                controllers[0].use_partitions(partitions, window)
+            if args.watch is not None:
+                controllers[0].watch(args.watch or args.dataset)
+        except Exception as error:
+            fail(error)
+            raise
+        ui.update_idletasks()
+        drawn = record_startup("first graph")
+        if args.measure_startup:
+            print(f"startup: window {shown:.2f}s, data loaded {loaded:.2f}s, "
+                  f"first graph {drawn:.2f}s")
+            ui.after_idle(ui.quit)
+
+    ui.update()
+    shown = record_startup("window shown")
+    # pyplot binds to the backend selected when seaborn first imports it
+    set_backend()
+    worker.submit("startup", load_model, start, args.dataset, args.stream,
+                  window, on_error=fail)
+    ui.run()
+    worker.shutdown()
+    if args.metrics:
+        METRICS.dump(args.metrics)
+    if errors:
+        sys.exit(f"Could not load {args.dataset}: {errors[0]}")
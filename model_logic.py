@@ -1,12 +1,32 @@
 """Logic for the visualizer"""
 import abc
-from visualizer_ui import Observer
+import threading
+import pandas as pd
+from observers import Observer
+from schema import apply_schema
+from indexes import RouteIndex, FlightIndex
+from price_cube import PriceCube
+from histograms import PriceHistograms
+from grouped_stats import GroupedStats
+from fare_query import FareIndex, FARE_COLUMNS
+from itinerary import RouteGraph, MAX_LEGS
+from fare_model import FareModel
+from correlations import CorrelationCache
+from queries import FlightQueries, format_departures, format_class_prices
+from instrumentation import timed, timer
+
+
+# the model hands out views of orig_df instead of copies, copy-on-write
+# makes sure a write to a derived frame never reaches orig_df.
+# pandas 3 always uses copy-on-write
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 
 class LogicSubject(abc.ABC):
     """An Interface for the DataFrameLogic"""
     @abc.abstractmethod
-    def attach(self, observer):
+    def attach(self, observer, state=None):
         """Attach an observer to the model"""
         raise NotImplementedError
 
@@ -23,11 +43,36 @@ class LogicSubject(abc.ABC):
 
 class DataframeLogic(LogicSubject):
     """The logic for the visualizer"""
-    _observers: list[Observer] = []
-    def __init__(self, df):
+    def __init__(self, df, routes=None, flights=None, cube=None,
+                 model_dir=None):
+        # observers of each state, the None key holds observers of every state
+        self._observers: dict[int | None, list[Observer]] = {}
+        # states notified since the observers were last updated
+        self.pending = []
+        self.schedule = None
         self.state = 1
-        self.orig_df = df
-        self.cur_df = self.orig_df.copy()
+        # where the fare model of df is saved, so it is trained only once
+        self.model_dir = model_dir
+        # held while the fare model or route graph is built or learns new
+        # rows, so queries on several worker threads do not each build them
+        # and an append never misses one being built
+        self.build_lock = threading.Lock()
+        # held while the fare model is trained, without build_lock so an
+        # append on the Tk thread does not wait for the training
+        self.training_lock = threading.Lock()
+        # counts the datasets set, so a fare model trained on a dataset
+        # that was replaced meanwhile is thrown away
+        self.loads = 0
+        # queries that take the route as parameters and leave the
+        # selection below alone, for running on worker threads
+        self.queries = FlightQueries(self)
+        self.set_data(df, routes, flights, cube)
+        # counts the appends and loads, so callers can tell the data has
+        # changed
+        self.version = 0
+        self.cur_df = self.orig_df
+        # describes which rows cur_df holds, graphs use it as a cache key
+        self.selection = ("all",)
         self.eco = None
         self.business = None
         self.pair = ("Delhi", "Mumbai")
@@ -35,20 +80,219 @@ class DataframeLogic(LogicSubject):
         self.graph_type = "Histogram"
         self.arguments = {}
         self.index = 0
+        # the summary graph shown, it differs from the page when a graph is
+        # picked with the graph selector
+        self.summary_graph = 0
         self.pair_city("Delhi", "Mumbai")
 
-    def attach(self, observer):
-        """Attach an observer to the model"""
-        self._observers.append(observer)
+    def attach(self, observer, state=None):
+        """
+        Attach an observer to the model
+
+        :param observer: An Observer
+        :param state: optional. An integer of the state the observer shows,
+         the observer is notified of every state if not given
+        """
+        self._observers.setdefault(state, []).append(observer)
 
     def detach(self, observer):
         """Detach an observer from the model"""
-        self._observers.remove(observer)
+        for observers in self._observers.values():
+            if observer in observers:
+                observers.remove(observer)
+
+    def set_scheduler(self, schedule):
+        """
+        Delays updating the observers until the scheduled call runs, so
+        several notifications in a row cause a single redraw.
+        Notifications must then come from the thread the scheduler runs on.
+
+        :param schedule: A function that calls a function later, such as a
+         Tk widget's after_idle. None updates the observers immediately
+        """
+        self.schedule = schedule
 
     def notify(self):
         """Notify a change in the model"""
-        for observers in self._observers:
-            observers.update_graph(self)
+        if self.state in self.pending:
+            # an update of this state is already scheduled
+            return
+        self.pending.append(self.state)
+        if self.schedule is None:
+            self.flush()
+        elif len(self.pending) == 1:
+            self.schedule(self.flush)
+
+    @timed()
+    def flush(self):
+        """Updates the observers of the states notified since the last flush"""
+        states, self.pending = self.pending, []
+        for state in states:
+            observers = (self._observers.get(state, []) +
+                         self._observers.get(None, []))
+            for observer in observers:
+                with timer(f"{type(observer).__name__}.update_graph"):
+                    observer.update_graph(self)
+
+    def set_data(self, df, routes=None, flights=None, cube=None):
+        """
+        Sets the dataset and builds what the queries need from it
+
+        :param df: A dataframe of flights
+        :param routes: optional. A RouteIndex of df
+        :param flights: optional. A FlightIndex of df
+        :param cube: optional. A PriceCube of df
+        """
+        self.orig_df = apply_schema(df)
+        self.loads += 1
+        # the indexes can be built ahead of time, see streaming.load_store
+        # and partitions.PartitionedDataset.open
+        self.routes = RouteIndex(self.orig_df) if routes is None else routes
+        self.flights = (FlightIndex(self.orig_df) if flights is None
+                        else flights)
+        self.cube = PriceCube(self.orig_df) if cube is None else cube
+        self.histograms = PriceHistograms(self.orig_df, self.routes)
+        self.stats = GroupedStats()
+        self.fares = FareIndex()
+        # built by the first itinerary search
+        self.route_graph = None
+        # loaded or trained by the first prediction, see get_fare_model
+        self.fare_model = None
+        self.correlations = CorrelationCache()
+        # the fewest and most days left of any booking, the days the fare
+        # forecast predicts
+        self.days_range = self.get_days_range(self.orig_df)
+
+    @staticmethod
+    def get_days_range(df, days_range=None):
+        """
+        Gets the fewest and most days left before departure of the bookings
+
+        :param df: A dataframe of flights
+        :param days_range: optional. A tuple of the range of the rows df is
+         added to, to widen
+        :return: A tuple of two integers, days_range if df is empty
+        """
+        if len(df) == 0:
+            return days_range
+        days = (int(df.days_left.min()), int(df.days_left.max()))
+        if days_range is None:
+            return days
+        return min(days[0], days_range[0]), max(days[1], days_range[1])
+
+    def load(self, df, routes=None, flights=None, cube=None):
+        """
+        Replaces the whole dataset, such as with the partitions of another
+        time window, keeping the current selection
+
+        :param df: A dataframe of flights
+        :param routes: optional. A RouteIndex of df
+        :param flights: optional. A FlightIndex of df
+        :param cube: optional. A PriceCube of df
+        """
+        # a saved fare model belongs to the dataset being replaced
+        self.model_dir = None
+        self.set_data(df, routes, flights, cube)
+        self.data_updated(None)
+
+    def append(self, df):
+        """
+        Adds new rows to the dataset. The indexes, price cube and cached
+        results are updated for the new rows only, and the observers are
+        told which routes changed so they only forget those graphs.
+
+        :param df: A dataframe of new flights with the dataset's columns
+        :return: A set of the (source, destination) routes that gained rows
+        """
+        new = apply_schema(df)[self.orig_df.columns]
+        if len(new) == 0:
+            return set()
+        old = self.orig_df
+        for column in old.columns:
+            if not isinstance(old[column].dtype, pd.CategoricalDtype):
+                continue
+            # keep the codes of the existing rows and add unseen values at
+            # the end of the categories
+            if isinstance(new[column].dtype, pd.CategoricalDtype):
+                # categories without rows would be dropped with a warning
+                new = new.assign(**{
+                    column: new[column].cat.remove_unused_categories()})
+            categories = old[column].cat.categories
+            unseen = pd.Index(new[column].dropna().unique()).difference(
+                categories)
+            if len(unseen):
+                old = old.assign(**{column: old[column].cat.add_categories(
+                    unseen)})
+            new = new.assign(**{column: pd.Categorical(
+                new[column], categories=old[column].cat.categories)})
+        offset = len(old)
+        # the dataframe is replaced before the indexes learn the new rows,
+        # so a query on another thread never sees positions past its end.
+        # A fare model trained meanwhile learns the new rows itself if it
+        # is not done by the time the dataframe is replaced
+        with self.build_lock:
+            self.orig_df = pd.concat([old, new], ignore_index=True)
+            fare_model = self.fare_model
+        self.routes.extend(new, offset)
+        self.flights.extend(new, offset)
+        self.cube.extend(new)
+        self.days_range = self.get_days_range(new, self.days_range)
+        routes = set(new[["source_city", "destination_city"]]
+                     .drop_duplicates().itertuples(index=False, name=None))
+        self.histograms.update(self.orig_df, routes)
+        self.stats.invalidate(
+            lambda selection: self.is_affected(selection, routes))
+        self.correlations.clear()
+        self.fares.invalidate(routes)
+        with self.build_lock:
+            if self.route_graph is not None:
+                self.route_graph.update(self.orig_df, self.routes, routes)
+            if fare_model is not None:
+                fare_model.partial_fit(new)
+        self.data_updated(routes)
+        return routes
+
+    def data_updated(self, routes):
+        """
+        Selects the current rows again and tells the observers the data
+        has changed
+
+        :param routes: A set of the (source, destination) routes whose rows
+         changed, None if every route may have changed
+        """
+        self.version += 1
+        self.refresh_selection()
+        observers = []
+        for group in self._observers.values():
+            observers.extend(observer for observer in group
+                             if observer not in observers)
+        for observer in observers:
+            observer.data_changed(self, routes)
+        self.notify()
+
+    @staticmethod
+    def is_affected(selection, routes):
+        """
+        Checks if new rows on some routes change the rows of a selection
+
+        :param selection: A tuple describing rows, see select
+        :param routes: A set of (source, destination) tuples, None if every
+         route changed
+        :return: True if the selection's rows may have changed
+        """
+        if routes is None:
+            return True
+        if selection[0] in ("route", "flight"):
+            return (selection[1], selection[2]) in routes
+        return True
+
+    def refresh_selection(self):
+        """Selects the current rows again after the dataset has changed"""
+        self.eco = self.select(("route", *self.pair, "Economy"))
+        self.business = self.select(("route", *self.pair, "Business"))
+        self.cur_df = self.select(self.selection)
+        if self.selection[0] == "count":
+            self.arguments["labels"] = self.cur_df.index.to_list()
 
     def increase_index(self):
         """Increase the index counter by 1"""
@@ -103,11 +347,8 @@ class DataframeLogic(LogicSubject):
         :param index: An integer to choose which graph to draw
         """
         self.state = 3
-        current = self.index
-        if index in range(4):
-            self.index = index
+        self.summary_graph = index if index in range(4) else self.index
         self.notify()
-        self.index = current
 
     def describe_statistics(self,flight="", mode=1):
         """
@@ -118,67 +359,30 @@ class DataframeLogic(LogicSubject):
         :return: A formatted string for a description of the data
         """
         if mode == 1:
-            string = self.cur_df.groupby(
-                "departure_time").flight.count().to_string()
-            string = string.splitlines()
-            if len(string) < 2:
-                return "No Departure data"
-            string[0] = string[0] + " number of departures"
-            description = ""
-            # I really should have used a monospaced font
-            padding = ["    ", "           ", "   ",
-                       "              ",
-                       "         ","             ","                  "]
-            count = 0
-            for strings in string:
-                split = strings.split(maxsplit=1)
-                description += split[0] + padding[count] + split[1]+"\n"
-                count += 1
-            return description
+            return format_departures(self.stats.get(
+                self.selection, self.cur_df, ["departure_time"]))
         elif mode == 2:
-            eco = self.eco[self.eco.flight == flight]
-            business = self.business[self.business.flight == flight]
-            eco_values = list(eco["price"].describe().values)
-            bus_values = list(business["price"].describe().values)
-            description = (f"Economy class price statistics:\n"
-                           f"Mean: {eco_values[1]:.2f} rupees\n"
-                           f"Min: {eco_values[3]:.2f} rupees\n"
-                           f"Max: {eco_values[-1]:.2f} rupees\n"
-                           f"\nBusiness class price statistics:\n"
-                           f"Mean: {bus_values[1]:.2f} rupees\n"
-                           f"Min: {bus_values[3]:.2f} rupees\n"
-                           f"Max: {bus_values[-1]:.2f} rupees")
-            return description
+            return format_class_prices(self.stats.get(
+                ("flight", *self.pair, flight), self.get_flight_rows(flight),
+                ["class"]))
         elif mode == 3:
             return "No statistics available"
-        elif mode == 4:
-            df = self.orig_df[self.orig_df["class"] == "Economy"]
-            airlines = df.airline.unique().tolist()
-            description = "Economy class price statistics:\n"
-            for airline in airlines:
-                cur_df = df[df.airline == airline]
-                values = list(cur_df["price"].describe().values)
-                describe = (f"\n*Price statistics for {airline}*\n"
-                            f"Mean: {values[1]:.2f} rupees\n"
-                            f"Min: {values[3]:.2f} rupees\n"
-                            f"Max: {values[-1]:.2f} rupees\n")
-                description += describe
-            return description
-        elif mode == 5:
-            df = self.orig_df[self.orig_df["class"] == "Business"]
-            airlines = df.airline.unique().tolist()
-            description = "Business class price statistics:\n"
-            for airline in airlines:
-                cur_df = df[df.airline == airline]
-                values = list(cur_df["price"].describe().values)
+        elif mode in (4, 5):
+            f_class = "Economy" if mode == 4 else "Business"
+            airlines = self.cube.summarize("airline", **{"class": f_class})
+            description = f"{f_class} class price statistics:\n"
+            for airline, values in airlines.iterrows():
                 describe = (f"\n*Price statistics for {airline}*\n"
-                            f"Mean: {values[1]:.2f} rupees\n"
-                            f"Min: {values[3]:.2f} rupees\n"
-                            f"Max: {values[-1]:.2f} rupees\n")
+                            f"Mean: {values['mean']:.2f} rupees\n"
+                            f"Min: {values['min']:.2f} rupees\n"
+                            f"Max: {values['max']:.2f} rupees\n")
                 description += describe
             return description
         elif mode == 6:
-            cor = self.orig_df[self.pair[0]].corr(self.orig_df[self.pair[1]])
+            f_class = self.selection[1] if self.selection[0] == "class" \
+                else None
+            cor = self.get_correlation_matrix(f_class=f_class).at[
+                self.pair[0], self.pair[1]]
             description = (f"{self.pair[0]} and {self.pair[1]} has a\n"
                            f"correlation coefficient of {cor:.2f}\n")
             if cor < 0:
@@ -201,17 +405,57 @@ class DataframeLogic(LogicSubject):
                 desc_relation = (f"which is considered to be a {modifier} "
                                  f"{relation} relation")
             return description + desc_relation
+        elif mode == 7:
+            _, method, f_class = self.selection
+            return (f"{method.capitalize()} correlation coefficients of "
+                    f"{f_class or 'all'} flights:\n\n" +
+                    self.cur_df.to_string(float_format="{:.2f}".format))
         return ""
 
-    def get_correlation_graph(self, var1, var2):
+    def get_correlation_matrix(self, method="pearson", f_class=None):
+        """
+        Gets the correlation of every pair of numerical attributes, computed
+        once until the data changes
+
+        :param method: optional. "pearson", or "spearman" for the rank
+         correlation
+        :param f_class: optional. A string of the ticket class, every flight
+         if not given
+        :return: A dataframe of correlation coefficients
+        """
+        return self.correlations.get(self.orig_df,
+                                     self.get_numerical_attributes(),
+                                     method, f_class)
+
+    def get_correlation_heatmap(self, method="pearson", f_class=None):
+        """
+        Notify observers to draw a heatmap of the correlation matrix
+
+        :param method: optional. "pearson" or "spearman"
+        :param f_class: optional. A string of the ticket class, every flight
+         if not given
+        """
+        self.state = 2
+        self.selection = ("correlation", method, f_class)
+        self.cur_df = self.select(self.selection)
+        self.graph_type = "Heatmap"
+        self.title = (f"{method.capitalize()} correlation of "
+                      f"{f_class or 'all'} flights")
+        self.arguments = {}
+        self.notify()
+
+    def get_correlation_graph(self, var1, var2, f_class=None):
         """
         Notify observers to draw a correlation graph
 
         :param var1: A string representing an attribute to use as the x-axis
         :param var2: A sting representing an attribute to use as the y-axis
+        :param f_class: optional. A string of the ticket class to plot,
+         every flight if not given
         """
         self.state = 2
-        self.cur_df = self.orig_df.copy()
+        self.selection = ("class", f_class) if f_class else ("all",)
+        self.cur_df = self.select(self.selection)
         self.graph_type = "Scatter"
         self.pair = (var1, var2)
         self.title = f"Scatter plot of {var1} and {var2}"
@@ -235,8 +479,8 @@ class DataframeLogic(LogicSubject):
 
         :param tier: A string representing the ticket class
         """
-        self.cur_df = self.orig_df.copy()
-        self.cur_df = self.cur_df[self.cur_df["class"] == tier]
+        self.selection = ("class", tier)
+        self.cur_df = self.select(self.selection)
         self.title = (f"{tier if tier else 'Unknown class'}"
                       f" ticket Price distribution grouped by airlines")
         self.arguments = {"x":"airline", "y":"price", "showfliers":False}
@@ -250,7 +494,8 @@ class DataframeLogic(LogicSubject):
         :param flight_code: A string of a flight-code to query the data with
         """
         self.pair_city(self.pair[0], self.pair[1])
-        self.cur_df = self.cur_df[self.cur_df.flight == flight_code]
+        self.selection = ("flight", *self.pair, flight_code)
+        self.cur_df = self.select(self.selection)
         self.state = 2
         self.graph_type = "Scatter"
         self.arguments = {"x":"days_left", "y":"price", "hue":"class"}
@@ -268,7 +513,8 @@ class DataframeLogic(LogicSubject):
         :param graph: An integer to select which type of graph to draw
         """
         self.state = 2
-        self.cur_df = self.orig_df.copy()
+        self.cur_df = self.orig_df
+        self.selection = ("all",)
         if graph < 2:
             self.arguments = {"x":attribute}
             self.title = f"Histogram of {attribute}"
@@ -283,9 +529,10 @@ class DataframeLogic(LogicSubject):
                 self.graph_type = "Histogram"
                 self.notify()
                 return
-            self.cur_df = self.cur_df.groupby(attribute).count()
+            self.selection = ("count", attribute)
+            self.cur_df = self.select(self.selection)
             self.arguments = {"labels":self.cur_df.index.to_list(),
-                              "x":self.cur_df.columns[1]}
+                              "x":"count"}
             self.title = (f"Distribution of {attribute} from total number of "
                           f"{attribute}")
             self.graph_type = "Pie"
@@ -301,6 +548,16 @@ class DataframeLogic(LogicSubject):
         self.pair_city(source, end)
         self.notify()
 
+    def get_price_bins(self):
+        """
+        Gets the price histogram of the current city pair
+
+        :return: A tuple of the bin edges and a dictionary of ticket classes
+         to arrays of bin counts
+        """
+        return (self.histograms.edges,
+                self.histograms.get_route(self.pair[0], self.pair[1]))
+
     def pair_city(self, source, end):
         """
         Groups the data by city pair
@@ -310,155 +567,190 @@ class DataframeLogic(LogicSubject):
         :param end: A string representing a name of airport to group
          as the destination airport
         """
-        df = self.orig_df[self.orig_df.source_city == source]
-        df = df[df.destination_city == end]
-        self.cur_df = df
+        self.selection = ("route", source, end)
+        self.cur_df = self.select(self.selection)
         self.pair = (source, end)
-        self.eco = self.cur_df[self.cur_df["class"] == "Economy"]
-        self.business = self.cur_df[self.cur_df["class"] == "Business"]
+        self.eco = self.select(("route", source, end, "Economy"))
+        self.business = self.select(("route", source, end, "Business"))
+
+    def select(self, selection):
+        """
+        Gets the rows a selection describes
+
+        :param selection: A tuple such as ("all",), ("route", source, end),
+         ("route", source, end, class), ("flight", source, end, code),
+         ("class", class), ("count", attribute) or
+         ("correlation", method, class)
+        :return: A dataframe of the selected rows, of the number of flights
+         of each value of the attribute for a count, or of the correlation
+         matrix
+        """
+        kind = selection[0]
+        if kind == "correlation":
+            return self.get_correlation_matrix(selection[1], selection[2])
+        if kind == "route":
+            return self.orig_df.take(self.routes.get_positions(*selection[1:]))
+        if kind == "flight":
+            route = self.routes.get_positions(selection[1], selection[2])
+            return self.orig_df.take(
+                self.flights.get_positions(selection[3], within=route))
+        if kind == "class":
+            rows = self.orig_df[self.orig_df["class"] == selection[1]]
+            # hide airlines without flights in this class from the box plot
+            return rows.assign(
+                airline=rows.airline.cat.remove_unused_categories())
+        if kind == "count":
+            return self.orig_df.groupby(selection[1],
+                                        observed=True).size().to_frame("count")
+        return self.orig_df
+
+    @timed()
+    def get_cheapest_fares(self, source, end, f_class=None, days=None,
+                           airlines=None, stops=None, count=10):
+        """
+        Finds the cheapest fares between two cities
+
+        :param source: A string of the departure city
+        :param end: A string of the arrival city
+        :param f_class: optional. A string of the ticket class, any class if
+         not given
+        :param days: optional. A tuple of the fewest and most days left
+         before departure
+        :param airlines: optional. A list of the airlines to include
+        :param stops: optional. A list of the numbers of stops to include
+        :param count: optional. An integer of the number of fares to find
+        :return: A dataframe of the fares, cheapest first
+        """
+        positions = self.fares.search(self.orig_df, self.routes, source, end,
+                                      f_class, days, airlines, stops, count)
+        return self.orig_df[FARE_COLUMNS].take(positions)
+
+    @timed()
+    def get_itineraries(self, source, end, f_class=None, by="price", count=3,
+                        max_legs=MAX_LEGS):
+        """
+        Finds the best ways to fly between two cities, with or without
+        connecting flights, going by the mean price and duration of each leg
+        in one ticket class
+
+        :param source: A string of the departure city
+        :param end: A string of the arrival city
+        :param f_class: optional. A string of the ticket class, the
+         itineraries of each class are ranked together if not given
+        :param by: optional. "price" for the cheapest or "duration" for the
+         fastest itineraries
+        :param count: optional. An integer of the number of itineraries
+        :param max_legs: optional. An integer of the most flights to take
+        :return: A dataframe of the route, class, legs, price and duration of
+         the itineraries, best first
+        """
+        with self.build_lock:
+            if self.route_graph is None:
+                self.route_graph = RouteGraph(self.orig_df, self.routes)
+            graph = self.route_graph
+        classes = [f_class] if f_class else self.routes.get_classes()
+        rows = []
+        for f_class in classes:
+            for _, path in graph.find_paths(source, end, f_class, by, count,
+                                            max_legs):
+                price, duration = graph.get_cost(path, f_class)
+                rows.append((" > ".join(path), f_class, len(path) - 1,
+                             round(price, 2), duration))
+        itineraries = pd.DataFrame(rows, columns=["route", "class", "legs",
+                                                  "price", "duration"])
+        return (itineraries.sort_values(by, kind="stable").head(count)
+                .reset_index(drop=True))
+
+    def get_fare_model(self):
+        """
+        Gets the fare model of the dataset, reading it from model_dir or
+        training and saving it the first time. Training takes a while, so
+        the controller calls this on a worker thread once the data is
+        loaded.
+
+        :return: A FareModel
+        """
+        with self.build_lock:
+            if self.fare_model is not None:
+                return self.fare_model
+        with self.training_lock:
+            with self.build_lock:
+                if self.fare_model is not None:
+                    return self.fare_model
+                df, loads, model_dir = self.orig_df, self.loads, self.model_dir
+            model = None
+            if model_dir is not None:
+                model = FareModel.load(model_dir)
+            if model is None or model.rows != len(df):
+                with timer("fare model training"):
+                    model = FareModel.from_frame(df)
+                if model_dir is not None:
+                    model.save(model_dir)
+            with self.build_lock:
+                if loads != self.loads:
+                    # the dataset was replaced while training
+                    return model
+                # learn the rows appended while training
+                if len(self.orig_df) > model.rows:
+                    model.partial_fit(self.orig_df.iloc[model.rows:])
+                self.fare_model = model
+                return model
+
+    @timed()
+    def predict_fares(self, bookings):
+        """
+        Predicts the price of many bookings in a single call
+
+        :param bookings: A dataframe of the airline, cities, times, stops,
+         class, days left and duration of each booking
+        :return: An array of the predicted prices in rupees
+        """
+        return self.get_fare_model().predict(bookings)
+
+    def get_flight_rows(self, flight_code, f_class=None):
+        """
+        Gets the rows of a flight code on the current city pair
+
+        :param flight_code: A string of a flight code to search the dataframe
+        :param f_class: optional. A string of the ticket class to select
+        :return: A dataframe of the flight's rows
+        """
+        route = self.routes.get_positions(self.pair[0], self.pair[1], f_class)
+        return self.orig_df.take(
+            self.flights.get_positions(flight_code, within=route))
 
     def get_flight_info(self, flight_code):
         """
-        Gets information about the flight
+        Gets information about the flight and selects the rows of its ticket
+        class on the current city pair
 
         :param flight_code: A string of a flight code to search the dataframe
+        :return: A FlightInfo of the first row of the code, None if it is not
+         found
         """
-        df = self.orig_df[self.orig_df["flight"] == flight_code]
-        if len(df) == 0:
-            return None, None, None, None, None, None, None
-        flight = df.iloc[0]
-        airline = flight.airline
-        stops = flight.stops
-        start = flight.departure_time
-        end = flight.arrival_time
-        price = flight.price
-        f_class = flight["class"]
-        duration = flight.duration
-        if f_class == "Economy":
+        info = self.queries.get_flight_info(flight_code)
+        if info is None:
+            return None
+        if info.f_class == "Economy":
             self.cur_df = self.eco
         else:
             self.cur_df = self.business
-        return airline, stops, start, end, price, duration, f_class
+        self.selection = ("route", *self.pair, info.f_class)
+        return info
 
     def generate_price_analysis(self, flight_code):
         """
-        Generates an analysis on the price of a flight
+        Generates an analysis on the price of a flight compared with the
+        current city pair, see FlightQueries.analyse_price for a query that
+        leaves the selection alone
 
         :param flight_code: A string of a flight code to search the dataframe
         :return: A string of the analysis
         """
-        (airline, stops, start, end,
-         price, dur, f_class) = self.get_flight_info(flight_code)
-        if airline is None:
-            return f"Flight not found"
-        airline = self.get_airline_analysis(airline)
-        stop = self.get_stop_analysis(stops)
-        time = self.get_time_analysis(start, end)
-        price_avg = self.cur_df.price.mean()
-        duration = self.get_average_cost_per_dist(dur)
-        timeframe = f'{start} to {end}'
-        statistic = (f"Flight:{flight_code:30}  Stops: {stops} stop(s)\n"
-                     f"Time :{timeframe:28}Price: {price} rupees\n"
-                     f"Duration : {str(dur) + ' hours':26}Class: {f_class}\n"
-                     f"The average cost of a flight from {self.pair[0]} to "
-                     f"{self.pair[1]}\nis {price_avg:.2f} rupees\n")
-        if price < price_avg:
-            dif = price_avg - price
-            analysis = (f"\nFlight {flight_code} is {dif:.02f} rupee cheaper "
-                        f"than the average\ncost of flights from "
-                        f"{self.pair[0]} to {self.pair[1]}.\nThe price of the "
-                        f"flight is influenced by the following factors:\n")
-        else:
-            dif = price - price_avg
-            analysis = (f"\nFlight {flight_code} is {dif:.2f} rupee more "
-                        f"expensive\nthan the average cost of flights from "
-                        f"{self.pair[0]} to {self.pair[1]}.\nThe price "
-                        f"of the flight is influenced by the following "
-                        f"factors:\n")
-        analysis += "\nDuration: " + duration
-        analysis += "\nAirline: " + airline
-        analysis += "\nNumber of stops: " + stop
-        analysis += "\nTime of day: " + time
-        statistic += analysis
-        return statistic
-
-    def get_airline_analysis(self, airline):
-        """
-        Gets an analysis on airlines in the current dataframe
-
-        :param airline: A string of an airline to search the dataframe with
-        :return: A string of the analysis
-        """
-        price_median = self.cur_df.price.mean()
-        airline_median = self.cur_df.groupby("airline").price.mean()
-        airline_med_price = airline_median[airline]
-        if airline_med_price < price_median:
-            percent = ((price_median-airline_med_price)/price_median)*100
-            return (f"{airline} on average provides {percent:.0f} percent "
-                    f"cheaper \nflights compared to similar flights"
-                    f" from other airlines.\n")
-        percent = ((airline_med_price-price_median) / price_median) * 100
-        return (f"{airline} on average provides {percent:.0f} percent\n"
-                f"more expensive flights compared to similar flights.\n")
-
-    def get_stop_analysis(self, stops):
-        """
-        Gets an analysis on the number of stops in the current dataframe
-
-        :param stops: An integer of number of stops
-        to search the dataframe with
-        :return: A string of the analysis
-        """
-        price_median = self.cur_df.price.mean()
-        stop_median = self.cur_df.groupby("stops").price.mean()
-        stop_med_price = stop_median[stops]
-        if stop_med_price < price_median:
-            percent = ((price_median-stop_med_price)/price_median)*100
-            return (f"A flight with {stops} stop(s) on average decreases\n"
-                    f"prices by {percent:.0f} percent compared to "
-                    f"similar flights.\n")
-        percent = ((stop_med_price-price_median) / price_median) * 100
-        return (f"A flight with {stops} stop(s) on average increases\n"
-                f"prices by {percent:.0f} percent compared to "
-                f"similar flights.\n")
-
-    def get_time_analysis(self, dep_time, end_time):
-        """
-        Gets an analysis on the number of stops in the current dataframe
-
-        :param dep_time: A string of the departure time to search the dataframe
-        :param end_time: A string of the arrival time to search the dataframe
-        :return: A string of the analysis
-        """
-        sorted_df = self.cur_df[self.cur_df.departure_time == dep_time]
-        price_median = sorted_df.price.mean()
-        time_median = sorted_df.groupby("arrival_time").price.mean()
-        time_med_price = time_median[end_time]
-        if time_med_price < price_median:
-            percent = ((price_median-time_med_price)/price_median)*100
-            return (f"A flight from {dep_time} to {end_time} on average\n"
-                    f"decreases prices by {percent:.0f} percent compared to "
-                    f"similar flights.\n")
-        percent = ((time_med_price-price_median) / price_median) * 100
-        return (f"A flight from {dep_time} to {end_time} on average\n"
-                f"decreases prices by {percent:.0f} percent compared to "
-                f"similar flights.\n")
-
-    def get_average_cost_per_dist(self, duration):
-        """
-        Gets an analysis of the average cost of fights within
-        a range of distances in the dataframe
-
-        :param duration: An integer to group flights with similar duration
-        :return: A string of the analysis
-        """
-        time = int(duration)
-        df = self.orig_df[self.orig_df["class"] == 'Economy']
-        sorted_df = df[(df.duration >= time) &
-                       (df.duration < time + 1)]
-        med_price = sorted_df.price.mean()
-        return (f"A flight with a duration of {duration} hours\n"
-                f"on average costs {med_price:.2f} rupees\n")
+        info = self.get_flight_info(flight_code)
+        if info is None:
+            return "Flight not found"
+        return self.queries.describe_price(self.pair, flight_code, info)
 
     def get_airport_names(self):
         """
@@ -466,8 +758,7 @@ class DataframeLogic(LogicSubject):
 
         :return: A list of airport names in the dataframe
         """
-        cities = self.orig_df.source_city.unique()
-        return cities.tolist()
+        return self.routes.get_sources()
 
     def get_dest_airports(self, start):
         """
@@ -475,8 +766,7 @@ class DataframeLogic(LogicSubject):
 
         :return: A list of destination airports in the dataframe
         """
-        cities = self.orig_df[self.orig_df.source_city == start]
-        return cities.destination_city.unique().tolist()
+        return self.routes.get_destinations(start)
 
     def get_flight_codes(self):
         """
@@ -509,8 +799,23 @@ class DataframeLogic(LogicSubject):
 
         :return: A list of strings of all ticket classes in the dataframe
         """
+        return self.routes.get_classes()
 
-        return self.orig_df["class"].unique().tolist()
+    def get_airlines(self):
+        """
+        Gets all airlines in the dataframe
+
+        :return: A list of strings of all airlines in the dataframe
+        """
+        return self.orig_df.airline.cat.categories.tolist()
+
+    def get_stops(self):
+        """
+        Gets all numbers of stops in the dataframe
+
+        :return: A list of strings of all numbers of stops in the dataframe
+        """
+        return self.orig_df.stops.cat.categories.tolist()
 
     def get_numerical_attributes(self):
         """
@@ -518,5 +823,4 @@ class DataframeLogic(LogicSubject):
 
         :return: A list of strings of all numerical attributes in the dataframe
         """
-        return self.orig_df.select_dtypes(include=["int64",
-                                                   "float64"]).columns.tolist()
+        return self.orig_df.select_dtypes(include="number").columns.tolist()
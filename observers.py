@@ -0,0 +1,19 @@
+"""Observer interface for views of the visualizer's model"""
+import abc
+
+
+class Observer(abc.ABC):
+    """An interface for the GraphManager"""
+    @abc.abstractmethod
+    def update_graph(self, logic):
+        """Receive an update from the model"""
+        raise NotImplementedError
+
+    def data_changed(self, logic, routes):
+        """
+        Receive the routes that gained rows, before the graphs are updated
+
+        :param logic: The model the rows were added to
+        :param routes: A set of (source, destination) tuples, None when the
+         whole dataset was replaced
+        """
@@ -0,0 +1,299 @@
+"""Flight datasets split into partition files, such as one per scrape date"""
+import glob
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+from data_cache import get_cache_dir, load_dataset, read_meta, is_cache_valid
+from indexes import RouteIndex, FlightIndex
+from price_cube import PriceCube
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+# a date in the name of a partition file, such as 2022-02-11 or 20220211
+PERIOD_PATTERN = re.compile(r"(\d{4})-?(\d{2})-?(\d{2})")
+
+
+def get_period(path):
+    """
+    Gets the date a partition file is named after
+
+    :param path: A string of the path to the partition file
+    :return: A string of the date as YYYY-MM-DD, None if the name has no date
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = PERIOD_PATTERN.search(name)
+    if match is None:
+        return None
+    return "-".join(match.groups())
+
+
+def concat_partitions(frames):
+    """
+    Joins the dataframes of several partitions. The categories of each
+    categorical column are united and the codes of every partition are
+    recoded to them.
+
+    :param frames: A list of dataframes with the same columns
+    :return: A dataframe of the rows of every partition in order
+    """
+    if len(frames) == 1:
+        return frames[0]
+    data = {}
+    for column in frames[0].columns:
+        parts = [frame[column] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            data[column] = pd.api.types.union_categoricals(
+                parts, sort_categories=True)
+        else:
+            data[column] = np.concatenate([part.to_numpy() for part in parts])
+    return pd.DataFrame(data, columns=frames[0].columns)
+
+
+class PartitionedDataset:
+    """
+    A directory of csv files that together form the flight dataset.
+
+    Every partition gets its own binary cache and route, flight and price
+    indexes, which are built once and memory mapped afterwards. A manifest
+    records the period and routes of every partition, so a query for a
+    time window or a route only opens the partitions that can hold its rows.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.cache_dir = os.path.join(directory, ".cache")
+        self.partitions = []
+        # the size of every file at the last scan, and at the last rescan
+        # that found the directory changed, see rescan
+        self.scanned = {}
+        self.pending = {}
+        self.scan()
+
+    def list_files(self):
+        """
+        Lists the partition files of the directory
+
+        :return: A sorted list of paths
+        """
+        return sorted(glob.glob(os.path.join(self.directory, "*.csv")))
+
+    def get_sizes(self):
+        """
+        Gets the size of every partition file
+
+        :return: A dictionary of paths to sizes in bytes
+        """
+        sizes = {}
+        for path in self.list_files():
+            try:
+                sizes[path] = os.path.getsize(path)
+            except FileNotFoundError:
+                # removed since the directory was listed
+                continue
+        return sizes
+
+    def read_manifest(self):
+        """
+        Reads the manifest of the partitions indexed so far
+
+        :return: A dictionary of file names to partition entries
+        """
+        try:
+            with open(os.path.join(self.cache_dir, MANIFEST_FILE)) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("version") != MANIFEST_VERSION:
+            return {}
+        return {entry["file"]: entry for entry in manifest["partitions"]}
+
+    def write_manifest(self):
+        """Writes the manifest of the partitions"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, MANIFEST_FILE)
+        with open(path + ".tmp", "w") as file:
+            json.dump({"version": MANIFEST_VERSION,
+                       "partitions": self.partitions}, file, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def scan(self):
+        """
+        Finds the partitions of the directory, indexing the ones that are
+        new or changed since the last scan. A file that cannot be indexed,
+        such as one removed during the scan or one that is not flight data,
+        is left out until it changes again.
+
+        :return: A list of the partition entries
+        """
+        known = self.read_manifest()
+        partitions = []
+        changed = False
+        self.scanned = self.get_sizes()
+        self.pending = self.scanned
+        for path in self.scanned:
+            name = os.path.basename(path)
+            entry = known.get(name)
+            meta = read_meta(get_cache_dir(path))
+            if (entry is None or meta is None or
+                    not is_cache_valid(meta, path, get_cache_dir(path)) or
+                    meta["source"]["sha256"] != entry["sha256"]):
+                try:
+                    entry = self.index_partition(path)
+                except (OSError, ValueError, KeyError):
+                    continue
+                changed = True
+            partitions.append(entry)
+        self.partitions = partitions
+        # removed files leave the manifest longer than the directory
+        if changed or len(partitions) != len(known):
+            self.write_manifest()
+        return partitions
+
+    def rescan(self):
+        """
+        Scans the directory again if partitions were added, changed or
+        removed since the last scan. A file is only scanned once its size
+        has not changed between two calls, as it may still be being written.
+
+        :return: A list of the periods of the partitions that changed, None
+         for a partition without a date
+        """
+        sizes = self.get_sizes()
+        if sizes == self.scanned:
+            return []
+        if sizes != self.pending:
+            self.pending = sizes
+            return []
+        before = {entry["file"]: entry for entry in self.partitions}
+        after = {entry["file"]: entry for entry in self.scan()}
+        changed = [entry for name, entry in after.items()
+                   if name not in before or
+                   before[name]["sha256"] != entry["sha256"]]
+        changed += [entry for name, entry in before.items()
+                    if name not in after]
+        return [entry["period"] for entry in changed]
+
+    @staticmethod
+    def in_window(period, window):
+        """
+        Checks if a partition belongs to a time window
+
+        :param period: A string of the partition's date, None if it has none
+        :param window: A tuple of the first and last date to include as
+         YYYY-MM-DD strings, None for every partition
+        :return: True if the partition is in the window
+        """
+        if window is None:
+            return True
+        return period is not None and window[0] <= period <= window[1]
+
+    @staticmethod
+    def index_partition(path):
+        """
+        Builds the cache and indexes of a partition
+
+        :param path: A string of the path to the partition file
+        :return: A dictionary of the partition's manifest entry
+        """
+        df = load_dataset(path)
+        cache_dir = get_cache_dir(path)
+        RouteIndex(df).save(cache_dir)
+        FlightIndex(df).save(cache_dir)
+        PriceCube(df).save(cache_dir)
+        routes = (df[["source_city", "destination_city"]].drop_duplicates()
+                  .itertuples(index=False, name=None))
+        return {"file": os.path.basename(path),
+                "sha256": read_meta(cache_dir)["source"]["sha256"],
+                "period": get_period(path), "rows": len(df),
+                "routes": sorted([source, end] for source, end in routes)}
+
+    def get_periods(self):
+        """
+        Gets the periods the partitions cover
+
+        :return: A sorted list of the dates of the dated partitions
+        """
+        return sorted({entry["period"] for entry in self.partitions
+                       if entry["period"] is not None})
+
+    def prune(self, window=None, route=None):
+        """
+        Gets the partitions that can hold the rows of a query
+
+        :param window: optional. A tuple of the first and last date to
+         include as YYYY-MM-DD strings, every partition if not given.
+         Partitions without a date are left out of a window
+        :param route: optional. A tuple of the source and destination city
+        :return: A list of partition entries
+        """
+        partitions = []
+        for entry in self.partitions:
+            if not self.in_window(entry["period"], window):
+                continue
+            if route is not None and list(route) not in entry["routes"]:
+                continue
+            partitions.append(entry)
+        return partitions
+
+    def get_path(self, entry):
+        """
+        Gets the path of a partition file
+
+        :param entry: A dictionary of the partition's manifest entry
+        :return: A string of the path
+        """
+        return os.path.join(self.directory, entry["file"])
+
+    def open(self, window=None):
+        """
+        Opens the partitions of a time window as one dataset. The indexes
+        and price cubes of the partitions are combined instead of being
+        built again from the rows.
+
+        :param window: optional. A tuple of the first and last date to include
+        :return: A dictionary of the dataframe and indexes to build a
+         DataframeLogic with
+        """
+        partitions = self.prune(window)
+        if not partitions:
+            raise ValueError(f"No partitions in {self.directory}" +
+                             (f" from {window[0]} to {window[1]}"
+                              if window else ""))
+        frames = []
+        routes = RouteIndex()
+        flights = FlightIndex()
+        cells = []
+        offset = 0
+        for entry in partitions:
+            path = self.get_path(entry)
+            cache_dir = get_cache_dir(path)
+            frames.append(load_dataset(path))
+            routes.add_index(RouteIndex.load(cache_dir), offset)
+            flights.add_index(FlightIndex.load(cache_dir), offset)
+            cells.append(PriceCube.load(cache_dir).cells)
+            offset += entry["rows"]
+        cube = PriceCube(cells=cells[0] if len(cells) == 1
+                         else PriceCube.merge(cells))
+        return {"df": concat_partitions(frames), "routes": routes,
+                "flights": flights, "cube": cube}
+
+    def get_rows(self, source, end, f_class=None, window=None):
+        """
+        Gets the rows of a route, reading only the partitions that hold it
+
+        :param source: A string of the departure city
+        :param end: A string of the arrival city
+        :param f_class: optional. A string of the ticket class
+        :param window: optional. A tuple of the first and last date to include
+        :return: A dataframe of the route's rows
+        """
+        frames = []
+        for entry in self.prune(window, (source, end)):
+            path = self.get_path(entry)
+            positions = RouteIndex.load(get_cache_dir(path)).get_positions(
+                source, end, f_class)
+            frames.append(load_dataset(path).take(positions))
+        if not frames:
+            return None
+        return concat_partitions(frames).reset_index(drop=True)
@@ -0,0 +1,132 @@
+"""Drawing functions shared by the UI's graphs and the batch renderer"""
+import seaborn as sns
+
+# scatter plots with more points than this are drawn as a density plot
+SCATTER_LIMIT = 20000
+
+
+def draw_dist_plot(ax, bins, pair):
+    """
+    Draw the price histogram from precomputed bin counts
+
+    :param ax: A matplotlib axes to draw on
+    :param bins: A tuple of the bin edges and a dictionary of ticket
+     classes to arrays of bin counts
+    :param pair: A tuple of strings to use in the title
+    """
+    ax.clear()
+    ax.set_title(f"price distribution of flights from {pair[0]}"
+                 f" to {pair[1]}")
+    ax.set_xlabel("price (rupee)")
+    ax.set_ylabel("Count")
+    edges, counts = bins
+    for f_class, values in counts.items():
+        ax.stairs(values, edges, fill=True, alpha=0.5, label=f_class)
+    ax.set_xscale("log")
+    if counts:
+        ax.legend(title="class")
+
+
+def draw_custom_plot(ax, data, graph_type, args, title):
+    """
+    Draw a non-predetermined graph
+
+    :param ax: A matplotlib axes to draw on
+    :param data: A dataframe object to plot
+    :param graph_type: A string denoting the type of graph to plot
+    :param args: A dictionary of arguments to plot the graph with
+    :param title: A string for the graph title
+    """
+    ax.set_title(title)
+    if graph_type == "Histogram":
+        sns.histplot(data=data, **args, ax=ax)
+        if "binwidth" in args:
+            ax.set_xticks(range(0, 51, 2))
+    elif graph_type == "Count":
+        sns.countplot(data=data, **args, ax=ax)
+    elif graph_type == "Scatter":
+        draw_scatter(ax, data, **args)
+    elif graph_type == "Pie":
+        ax.pie(data=data, **args, autopct='%.1f%%', startangle=0)
+    elif graph_type == "Box":
+        sns.boxplot(data=data, **args, ax=ax)
+    elif graph_type == "Heatmap":
+        sns.heatmap(data, annot=True, fmt=".2f", vmin=-1, vmax=1,
+                    cmap="coolwarm", square=True, ax=ax, **args)
+
+
+def draw_scatter(ax, data, x, y, **kwargs):
+    """
+    Draws a scatter plot, large data sets are binned into hexagons
+    instead of drawing every point
+
+    :param ax: A matplotlib axes to draw on
+    :param data: A dataframe object to plot
+    :param x: A string of the attribute to use as the x-axis
+    :param y: A string of the attribute to use as the y-axis
+    :param kwargs: Other arguments for the scatter plot, such as hue
+    """
+    numeric = data[x].dtype.kind in "iuf" and data[y].dtype.kind in "iuf"
+    if len(data) <= SCATTER_LIMIT or not numeric:
+        sns.scatterplot(data=data, x=x, y=y, **kwargs, ax=ax)
+        mode = f"{len(data):,} points"
+    else:
+        bins = ax.hexbin(data[x].to_numpy(), data[y].to_numpy(),
+                         gridsize=60, bins="log", mincnt=1)
+        ax.figure.colorbar(bins, ax=ax, label="number of flights")
+        ax.set_xlabel(x)
+        ax.set_ylabel(y)
+        mode = f"density of {len(data):,} points"
+    ax.text(0.99, 0.99, mode, transform=ax.transAxes,
+            ha="right", va="top", fontsize="small", alpha=0.7)
+
+
+def draw_summary_plot(ax, data, index):
+    """
+    Draw the corresponding graph for the summary page
+
+    :param ax: A matplotlib axes to draw on
+    :param data: A dataframe object to plot
+    :param index: An integer to choose which graph to plot
+    """
+    if index == 0:
+        airlines = []
+        for airline in list(data.airline.unique()):
+            air_data = data[data.airline == airline]
+            airlines.append(air_data)
+        colors = ["r", "g", "b", 'y', 'pink', 'purple']
+        sorted_a = []
+        for airline in airlines:
+            dfs = airline.groupby("stops", observed=True).price.mean()
+            sorted_a.append(dfs)
+        for airlines in sorted_a:
+            if airlines.shape[0] < 3:
+                airlines.loc[2] = 0
+        bottom = 0
+        for i in range(6):
+            ax.bar(["0", "1", "2"], sorted_a[i], color=colors[i],
+                   bottom=bottom)
+            bottom += sorted_a[i]
+        ax.autoscale()
+        ax.legend(list(data.airline.unique()))
+        ax.set_xlabel("stops")
+        ax.set_ylabel("price")
+        ax.set_title("Mean price of flights by number of stops by"
+                     " airline")
+    elif index == 1:
+        data = data[data["class"] == "Economy"]
+        draw_scatter(ax, data, x="days_left", y="price")
+        ax.set_xlabel("days booked before flight")
+        ax.set_ylabel("price")
+        ax.set_title("Scatter plot of days booked before flight and"
+                     " price for Economy tickets")
+    elif index == 2:
+        data = data[data["class"] == "Economy"]
+        data = data.groupby(["departure_time", "arrival_time"],
+                            observed=True).price.mean()
+        data.unstack().plot.bar(ax=ax, rot=0)
+        ax.set(ylim=(3000, 9000))
+        ax.set_title("Economy ticket price distribution by departure "
+                     "and arrival time")
+        ax.set_xlabel("departure time")
+        ax.set_ylabel("price")
@@ -0,0 +1,62 @@
+"""Prefix search over the values offered by the comboboxes"""
+from bisect import bisect_left, insort
+
+# most values shown in a combobox's dropdown at a time
+MAX_SUGGESTIONS = 500
+
+
+class PrefixIndex:
+    """
+    A sorted array of values for finding every value that starts with some
+    text, ignoring case, by binary search. Membership is checked with a set.
+    """
+    def __init__(self, values=()):
+        self.items = []
+        self.members = set()
+        self.keys = []
+        self.update(values)
+
+    def update(self, values):
+        """
+        Adds the values that are not in the index yet
+
+        :param values: An iterable of strings
+        """
+        new = [value for value in dict.fromkeys(values)
+               if value not in self.members]
+        if not new:
+            return
+        self.items.extend(new)
+        self.members.update(new)
+        if len(new) < len(self.keys) // 8:
+            for value in new:
+                insort(self.keys, (value.casefold(), value))
+        else:
+            self.keys = sorted((value.casefold(), value)
+                               for value in self.items)
+
+    def complete(self, prefix, limit=MAX_SUGGESTIONS):
+        """
+        Gets the values that start with a prefix
+
+        :param prefix: A string typed so far
+        :param limit: optional. An integer of the most values to return
+        :return: A list of matching values, in sorted order, or every value
+         in the order they were added if the prefix is empty
+        """
+        if not prefix:
+            return self.items[:limit]
+        prefix = prefix.casefold()
+        start = bisect_left(self.keys, (prefix,))
+        matches = []
+        for key, value in self.keys[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            matches.append(value)
+        return matches
+
+    def __contains__(self, value):
+        return value in self.members
+
+    def __len__(self):
+        return len(self.items)
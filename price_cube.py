@@ -0,0 +1,219 @@
+"""Pre-aggregated price statistics for the flight dataframe"""
+import os
+import numpy as np
+import pandas as pd
+
+ROUTE_KEYS = ["source_city", "destination_city", "class"]
+CELL_KEYS = ["airline", "stops", "departure_time", "arrival_time",
+             "duration_bucket"]
+# how the columns of two cells are combined when rolling them up
+AGGREGATES = {"count": "sum", "sum": "sum", "sumsq": "sum", "min": "min",
+              "max": "max"}
+# the cells of a cube in a cache directory, as arrays so reading them
+# cannot run code the way unpickling can
+CUBE_FILE = "price_cube.npz"
+
+
+class PriceCube:
+    """
+    Count, sum, sum of squares, min and max of the price for every
+    combination of route, class, airline, stops, departure time, arrival
+    time and duration bucket. Analyses are answered by rolling up the cells.
+    """
+    def __init__(self, df=None, cells=None):
+        if cells is None:
+            cells = self.aggregate(df)
+        self.set_cells(cells)
+
+    def set_cells(self, cells):
+        """
+        Replaces the cells of the cube and forgets earlier roll-ups
+
+        :param cells: A dataframe of cells from aggregate
+        """
+        self.cells = cells
+        self.slices = {key: cells.droplevel(ROUTE_KEYS) for key, cells in
+                       self.cells.groupby(level=ROUTE_KEYS, observed=True)}
+        self.rollups = {}
+
+    @staticmethod
+    def aggregate(df):
+        """
+        Aggregates the prices of a dataframe into cube cells
+
+        :param df: A dataframe of flights
+        :return: A dataframe of count, sum, sumsq, min and max indexed by the
+         cube keys
+        """
+        price = df.price.to_numpy(dtype=np.float64)
+        cells = pd.DataFrame({
+            **{key: df[key] for key in ROUTE_KEYS + CELL_KEYS[:-1]},
+            "duration_bucket": np.floor(df.duration.to_numpy()).astype(
+                np.int16),
+            "price": price,
+            "sumsq": price * price})
+        return cells.groupby(ROUTE_KEYS + CELL_KEYS, observed=True).agg(
+            count=("price", "size"), sum=("price", "sum"),
+            sumsq=("sumsq", "sum"), min=("price", "min"),
+            max=("price", "max"))
+
+    @staticmethod
+    def merge(parts):
+        """
+        Merges cells aggregated from different rows into one set of cells
+
+        :param parts: A list of dataframes of cells from aggregate
+        :return: A dataframe of the merged cells
+        """
+        cells = pd.concat(parts)
+        return cells.groupby(level=ROUTE_KEYS + CELL_KEYS,
+                             observed=True).agg(AGGREGATES)
+
+    def extend(self, df):
+        """
+        Adds the prices of more flights to the cube
+
+        :param df: A dataframe of flights
+        """
+        self.set_cells(self.merge([self.cells, self.aggregate(df)]))
+
+    @staticmethod
+    def combine(cells, by=None):
+        """
+        Rolls up cube cells
+
+        :param cells: A dataframe of cube cells
+        :param by: optional. A string of a cube key to group the result by
+        :return: A dataframe of the combined cells and their mean indexed by
+         the by key, or a series of the totals if by is not given
+        """
+        if by is None:
+            result = pd.Series({name: cells[name].agg(how)
+                                for name, how in AGGREGATES.items()})
+            result["mean"] = (result["sum"] / result["count"]
+                              if result["count"] else float("nan"))
+            return result
+        result = cells.groupby(level=by, observed=True).agg(AGGREGATES)
+        result["mean"] = result["sum"] / result["count"]
+        return result
+
+    @staticmethod
+    def select(cells, filters):
+        """
+        Selects the cube cells matching some keys
+
+        :param cells: A dataframe of cube cells
+        :param filters: A dictionary of cube keys and their values
+        :return: A dataframe of the matching cells
+        """
+        for name, value in filters.items():
+            cells = cells[cells.index.get_level_values(name) == value]
+        return cells
+
+    def rollup(self, source, end, f_class, by=None, **filters):
+        """
+        Rolls up the cells of a route and class
+
+        :param source: A string representing the departure airport
+        :param end: A string representing the arrival airport
+        :param f_class: A string of the ticket class
+        :param by: optional. A string of a cube key to group the result by
+        :param filters: Cube keys and the values they must be equal to
+        :return: A dataframe of count, sum, sumsq, min, max and mean indexed
+         by the by key, or a series of the totals if by is not given
+        """
+        key = (source, end, f_class, by, tuple(sorted(filters.items())))
+        if key not in self.rollups:
+            cells = self.slices.get((source, end, f_class))
+            if cells is None:
+                cells = self.cells.droplevel(ROUTE_KEYS).iloc[:0]
+            self.rollups[key] = self.combine(self.select(cells, filters), by)
+        return self.rollups[key]
+
+    def summarize(self, by=None, **filters):
+        """
+        Rolls up the cells of every route
+
+        :param by: optional. A string of a cube key to group the result by
+        :param filters: Cube keys and the values they must be equal to
+        :return: A dataframe of count, sum, sumsq, min, max and mean indexed
+         by the by key, or a series of the totals if by is not given
+        """
+        key = ("all", by, tuple(sorted(filters.items())))
+        if key not in self.rollups:
+            self.rollups[key] = self.combine(
+                self.select(self.cells, filters), by)
+        return self.rollups[key]
+
+    def get_mean(self, source, end, f_class, **filters):
+        """
+        Gets the mean price of a route and class
+
+        :param source: A string representing the departure airport
+        :param end: A string representing the arrival airport
+        :param f_class: A string of the ticket class
+        :param filters: Cube keys and the values they must be equal to
+        :return: A float of the mean price, nan if there are no flights
+        """
+        return self.rollup(source, end, f_class, **filters)["mean"]
+
+    def get_duration_mean(self, f_class, bucket):
+        """
+        Gets the mean price of every flight of a class within a duration bucket
+
+        :param f_class: A string of the ticket class
+        :param bucket: An integer of the duration in whole hours
+        :return: A float of the mean price, nan if there are no flights
+        """
+        result = self.summarize("duration_bucket", **{"class": f_class})
+        if bucket not in result.index:
+            return float("nan")
+        return result.at[bucket, "mean"]
+
+    def save(self, directory):
+        """
+        Writes the cells of the cube as arrays, the index as the codes of
+        its levels
+
+        :param directory: A string of the directory to write to
+        """
+        index = self.cells.index
+        arrays = {column: self.cells[column].to_numpy()
+                  for column in AGGREGATES}
+        for name, level, codes in zip(index.names, index.levels,
+                                      index.codes):
+            arrays[f"{name}_codes"] = codes
+            if isinstance(level, pd.CategoricalIndex):
+                arrays[f"{name}_categories"] = \
+                    level.categories.to_numpy().astype(str)
+                arrays[f"{name}_level"] = level.codes
+            else:
+                arrays[f"{name}_level"] = level.to_numpy()
+        temp = os.path.join(directory, "price_cube.tmp.npz")
+        np.savez(temp, **arrays)
+        os.replace(temp, os.path.join(directory, CUBE_FILE))
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Reads a cube written by save
+
+        :param directory: A string of the directory to read from
+        :return: A PriceCube
+        """
+        with np.load(os.path.join(directory, CUBE_FILE)) as data:
+            levels = []
+            for name in ROUTE_KEYS + CELL_KEYS:
+                if f"{name}_categories" in data:
+                    level = pd.CategoricalIndex(pd.Categorical.from_codes(
+                        data[f"{name}_level"], data[f"{name}_categories"]))
+                else:
+                    level = pd.Index(data[f"{name}_level"])
+                levels.append(level)
+            index = pd.MultiIndex(
+                levels=levels, names=ROUTE_KEYS + CELL_KEYS,
+                codes=[data[f"{name}_codes"]
+                       for name in ROUTE_KEYS + CELL_KEYS])
+            cells = pd.DataFrame({column: data[column]
+                                  for column in AGGREGATES}, index=index)
+        return cls(cells=cells)
@@ -0,0 +1,321 @@
+"""Stateless queries of the flight data, safe to run on worker threads"""
+from collections import namedtuple
+import numpy as np
+from grouped_stats import format_table
+
+# the row of a flight the analyses describe
+FlightInfo = namedtuple("FlightInfo", ["position", "airline", "stops",
+                                       "departure_time", "arrival_time",
+                                       "price", "duration", "f_class"])
+
+
+def clip_positions(positions, rows):
+    """
+    Drops the positions past the end of a dataframe, which an index may
+    already hold while rows are being appended
+
+    :param positions: A sorted array of row positions
+    :param rows: An integer of the number of rows of the dataframe
+    :return: An array of the positions within the dataframe
+    """
+    return positions[:np.searchsorted(positions, rows)]
+
+
+def format_departures(departures):
+    """
+    Formats the number of departures at each time of day
+
+    :param departures: A dataframe of statistics grouped by departure time
+    :return: A formatted string of the table
+    """
+    if departures.empty:
+        return "No Departure data"
+    return format_table(departures, ["count"],
+                        ["departure_time", "number of departures"])
+
+
+def format_class_prices(classes):
+    """
+    Formats the price statistics of each ticket class
+
+    :param classes: A dataframe of statistics grouped by class
+    :return: A formatted string of the statistics
+    """
+    description = ""
+    # a class the flight does not have is described as nan
+    for f_class, values in classes.reindex(["Economy",
+                                            "Business"]).iterrows():
+        description += (f"{f_class} class price statistics:\n"
+                        f"Mean: {values['mean']:.2f} rupees\n"
+                        f"Min: {values['min']:.2f} rupees\n"
+                        f"Max: {values['max']:.2f} rupees\n\n")
+    return description.rstrip("\n")
+
+
+class FlightQueries:
+    """
+    Queries of a DataframeLogic's data that never change the model.
+
+    Every query takes the route it is about as parameters instead of
+    reading the model's selection, and returns strings, tuples or
+    dataframes that are not shared with the model, so queries can run on
+    several worker threads at once while the Tk thread keeps what is
+    selected. A query reads the dataframe once when it starts, so rows
+    appended while it runs are left out of it.
+    """
+    def __init__(self, logic):
+        self.logic = logic
+
+    def get_route_rows(self, source, end, f_class=None):
+        """
+        Gets the rows of a route
+
+        :param source: A string of the departure city
+        :param end: A string of the arrival city
+        :param f_class: optional. A string of the ticket class
+        :return: A dataframe of the route's rows, copy-on-write keeps writes
+         to it from reaching the model
+        """
+        df = self.logic.orig_df
+        positions = self.logic.routes.get_positions(source, end, f_class)
+        return df.take(clip_positions(positions, len(df)))
+
+    def get_flight_codes(self, source, end):
+        """
+        Gets the flight codes of a route
+
+        :param source: A string of the departure city
+        :param end: A string of the arrival city
+        :return: A tuple of flight codes in order of first appearance
+        """
+        return tuple(self.get_route_rows(source, end).flight.unique())
+
+    def get_flight_positions(self, flight_code, source=None, end=None):
+        """
+        Gets the row positions of a flight code
+
+        :param flight_code: A string of a flight code
+        :param source: optional. A string of the departure city to limit the
+         rows to, with end
+        :param end: optional. A string of the arrival city
+        :return: A sorted array of row positions
+        """
+        df = self.logic.orig_df
+        route = None
+        if source is not None:
+            route = self.logic.routes.get_positions(source, end)
+        positions = self.logic.flights.get_positions(flight_code, within=route)
+        return clip_positions(positions, len(df))
+
+    def get_flight_info(self, flight_code, source=None, end=None):
+        """
+        Gets the first row of a flight code
+
+        :param flight_code: A string of a flight code
+        :param source: optional. A string of the departure city to look for
+         the flight on, with end, every route if not given
+        :param end: optional. A string of the arrival city
+        :return: A FlightInfo, None if the flight is not found
+        """
+        positions = self.get_flight_positions(flight_code, source, end)
+        if len(positions) == 0:
+            return None
+        flight = self.logic.orig_df.iloc[positions[0]]
+        # durations are stored as float32, round off the conversion noise
+        return FlightInfo(int(positions[0]), flight.airline, flight.stops,
+                          flight.departure_time, flight.arrival_time,
+                          int(flight.price), round(float(flight.duration), 2),
+                          flight["class"])
+
+    def describe_departures(self, source, end):
+        """
+        Counts the departures of a route at each time of day
+
+        :param source: A string of the departure city
+        :param end: A string of the arrival city
+        :return: A formatted string of the table
+        """
+        departures = self.logic.stats.get(("route", source, end),
+                                          self.get_route_rows(source, end),
+                                          ["departure_time"])
+        return format_departures(departures)
+
+    def describe_flight(self, source, end, flight_code):
+        """
+        Describes the prices of a flight on a route in each ticket class
+
+        :param source: A string of the departure city
+        :param end: A string of the arrival city
+        :param flight_code: A string of a flight code
+        :return: A formatted string of the statistics
+        """
+        rows = self.logic.orig_df.take(
+            self.get_flight_positions(flight_code, source, end))
+        classes = self.logic.stats.get(("flight", source, end, flight_code),
+                                       rows, ["class"])
+        return format_class_prices(classes)
+
+    def analyse_price(self, source, end, flight_code):
+        """
+        Analyses the price of a flight on a route
+
+        :param source: A string of the departure city
+        :param end: A string of the arrival city
+        :param flight_code: A string of a flight code
+        :return: A string of the analysis
+        """
+        info = self.get_flight_info(flight_code, source, end)
+        if info is None:
+            return "Flight not found"
+        return self.describe_price((source, end), flight_code, info)
+
+    def describe_price(self, route, flight_code, info):
+        """
+        Writes the analysis of a flight's price
+
+        :param route: A tuple of the departure and arrival city to compare
+         the flight with
+        :param flight_code: A string of a flight code
+        :param info: A FlightInfo of the flight
+        :return: A string of the analysis
+        """
+        source, end = route
+        f_class = info.f_class
+        price = info.price
+        price_avg = self.logic.cube.get_mean(source, end, f_class)
+        timeframe = f"{info.departure_time} to {info.arrival_time}"
+        statistic = (f"Flight:{flight_code:30}  Stops: {info.stops} stop(s)\n"
+                     f"Time :{timeframe:28}Price: {price} rupees\n"
+                     f"Duration : {str(info.duration) + ' hours':26}"
+                     f"Class: {f_class}\n"
+                     f"The average cost of a flight from {source} to "
+                     f"{end}\nis {price_avg:.2f} rupees\n")
+        if price < price_avg:
+            dif = price_avg - price
+            analysis = (f"\nFlight {flight_code} is {dif:.02f} rupee cheaper "
+                        f"than the average\ncost of flights from "
+                        f"{source} to {end}.\nThe price of the "
+                        f"flight is influenced by the following factors:\n")
+        else:
+            dif = price - price_avg
+            analysis = (f"\nFlight {flight_code} is {dif:.2f} rupee more "
+                        f"expensive\nthan the average cost of flights from "
+                        f"{source} to {end}.\nThe price "
+                        f"of the flight is influenced by the following "
+                        f"factors:\n")
+        analysis += "\nDuration: " + self.analyse_duration(info.duration)
+        analysis += "\nAirline: " + self.analyse_airline(route, info.airline,
+                                                         f_class)
+        analysis += "\nNumber of stops: " + self.analyse_stops(
+            route, info.stops, f_class)
+        analysis += "\nTime of day: " + self.analyse_time(
+            route, info.departure_time, info.arrival_time, f_class)
+        forecast = self.forecast_fare(info)
+        if forecast is not None:
+            analysis += "\nForecast: " + forecast
+        return statistic + analysis
+
+    def analyse_airline(self, route, airline, f_class):
+        """
+        Gets an analysis on the airlines of a route
+
+        :param route: A tuple of the departure and arrival city
+        :param airline: A string of an airline to search the dataframe with
+        :param f_class: A string of the ticket class to compare with
+        :return: A string of the analysis
+        """
+        cube = self.logic.cube
+        price_median = cube.get_mean(*route, f_class)
+        airline_median = cube.rollup(*route, f_class, by="airline")["mean"]
+        airline_med_price = airline_median[airline]
+        if airline_med_price < price_median:
+            percent = ((price_median-airline_med_price)/price_median)*100
+            return (f"{airline} on average provides {percent:.0f} percent "
+                    f"cheaper \nflights compared to similar flights"
+                    f" from other airlines.\n")
+        percent = ((airline_med_price-price_median) / price_median) * 100
+        return (f"{airline} on average provides {percent:.0f} percent\n"
+                f"more expensive flights compared to similar flights.\n")
+
+    def analyse_stops(self, route, stops, f_class):
+        """
+        Gets an analysis on the number of stops of a route
+
+        :param route: A tuple of the departure and arrival city
+        :param stops: A string of the number of stops
+        :param f_class: A string of the ticket class to compare with
+        :return: A string of the analysis
+        """
+        cube = self.logic.cube
+        price_median = cube.get_mean(*route, f_class)
+        stop_median = cube.rollup(*route, f_class, by="stops")["mean"]
+        stop_med_price = stop_median[stops]
+        if stop_med_price < price_median:
+            percent = ((price_median-stop_med_price)/price_median)*100
+            return (f"A flight with {stops} stop(s) on average decreases\n"
+                    f"prices by {percent:.0f} percent compared to "
+                    f"similar flights.\n")
+        percent = ((stop_med_price-price_median) / price_median) * 100
+        return (f"A flight with {stops} stop(s) on average increases\n"
+                f"prices by {percent:.0f} percent compared to "
+                f"similar flights.\n")
+
+    def analyse_time(self, route, dep_time, end_time, f_class):
+        """
+        Gets an analysis on the time of day of a route
+
+        :param route: A tuple of the departure and arrival city
+        :param dep_time: A string of the departure time to search the dataframe
+        :param end_time: A string of the arrival time to search the dataframe
+        :param f_class: A string of the ticket class to compare with
+        :return: A string of the analysis
+        """
+        cube = self.logic.cube
+        price_median = cube.get_mean(*route, f_class, departure_time=dep_time)
+        time_median = cube.rollup(*route, f_class, by="arrival_time",
+                                  departure_time=dep_time)["mean"]
+        time_med_price = time_median[end_time]
+        if time_med_price < price_median:
+            percent = ((price_median-time_med_price)/price_median)*100
+            return (f"A flight from {dep_time} to {end_time} on average\n"
+                    f"decreases prices by {percent:.0f} percent compared to "
+                    f"similar flights.\n")
+        percent = ((time_med_price-price_median) / price_median) * 100
+        return (f"A flight from {dep_time} to {end_time} on average\n"
+                f"decreases prices by {percent:.0f} percent compared to "
+                f"similar flights.\n")
+
+    def analyse_duration(self, duration):
+        """
+        Gets an analysis of the average cost of flights of a similar
+        duration
+
+        :param duration: A float of the flight's duration in hours
+        :return: A string of the analysis
+        """
+        med_price = self.logic.cube.get_duration_mean("Economy",
+                                                      int(duration))
+        return (f"A flight with a duration of {duration} hours\n"
+                f"on average costs {med_price:.2f} rupees\n")
+
+    def forecast_fare(self, info):
+        """
+        Predicts the price of a flight for every number of days it can be
+        booked ahead
+
+        :param info: A FlightInfo of the flight
+        :return: A string of the forecast, None while the fare model is
+         being trained
+        """
+        if self.logic.fare_model is None:
+            return None
+        first, last = self.logic.days_range
+        days = np.arange(first, last + 1)
+        flight = self.logic.orig_df.iloc[np.repeat(info.position, len(days))]
+        prices = self.logic.predict_fares(flight.assign(days_left=days))
+        booked = int(flight.days_left.iloc[0])
+        cheapest = int(np.argmin(prices))
+        return (f"The fare model predicts {prices[booked - days[0]]:.0f} "
+                f"rupees when booked\n{booked} days ahead, and the lowest "
+                f"price, {prices[cheapest]:.0f} rupees,\nwhen booked "
+                f"{days[cheapest]} days ahead\n")
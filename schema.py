@@ -0,0 +1,97 @@
+"""Declared column types for the flight dataset"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# flight codes have a few thousand distinct values so storing them as a
+# category dictionary encodes them into small integer codes
+FLIGHT_SCHEMA = {
+    "airline": "category",
+    "flight": "category",
+    "source_city": "category",
+    "departure_time": "category",
+    "stops": "category",
+    "arrival_time": "category",
+    "destination_city": "category",
+    "class": "category",
+    "duration": "float32",
+    "days_left": "int16",
+    "price": "int32",
+}
+
+
+def apply_schema(df, schema=None):
+    """
+    Converts the columns of a dataframe to their declared types
+
+    :param df: A dataframe to convert
+    :param schema: optional. A dictionary of column names to dtypes
+    :return: A dataframe with the declared column types
+    """
+    if schema is None:
+        schema = FLIGHT_SCHEMA
+    types = {}
+    for column, dtype in schema.items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        if dtype != "category" and np.dtype(dtype).kind == "i":
+            check_range(df[column], dtype)
+        types[column] = dtype
+    if not types:
+        return df
+    return df.astype(types)
+
+
+def check_range(series, dtype):
+    """
+    Checks that a column fits in a narrower integer type
+
+    :param series: A series of integers
+    :param dtype: A string of the integer type to convert to
+    :raises ValueError: if a value would overflow the new type
+    """
+    if len(series) == 0:
+        return
+    limits = np.iinfo(dtype)
+    if series.min() < limits.min or series.max() > limits.max:
+        raise ValueError(f"Column {series.name} does not fit in {dtype}")
+
+
+def memory_usage(df):
+    """
+    Gets the memory used by each column of a dataframe
+
+    :param df: A dataframe to measure
+    :return: A series of the number of bytes used by each column
+    """
+    return df.memory_usage(index=False, deep=True)
+
+
+def memory_report(before, after):
+    """
+    Generates a report comparing the footprint of two dataframes
+
+    :param before: A dataframe before the schema was applied
+    :param after: A dataframe after the schema was applied
+    :return: A formatted string of the memory used by each column
+    """
+    old = memory_usage(before)
+    new = memory_usage(after)
+    width = max(len(str(column)) for column in old.index) + 2
+    lines = [f"{'column':{width}}{'before':>14}{'after':>14}  dtype"]
+    for column in old.index:
+        lines.append(f"{column:{width}}{old[column] / 2**20:>11.2f} MB"
+                     f"{new[column] / 2**20:>11.2f} MB  "
+                     f"{after[column].dtype}")
+    lines.append(f"{'total':{width}}{old.sum() / 2**20:>11.2f} MB"
+                 f"{new.sum() / 2**20:>11.2f} MB  "
+                 f"({old.sum() / max(new.sum(), 1):.1f}x smaller)")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.getcwd(), "Datasets", "Indian Airlines.csv")
+    raw = pd.read_csv(path)
+    print(memory_report(raw, apply_schema(raw)))
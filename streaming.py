@@ -0,0 +1,245 @@
+"""Chunked ingestion of flight datasets that do not fit in memory"""
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from data_cache import (CACHE_VERSION, get_cache_dir, get_code_dtype,
+                        is_cache_valid, read_cache, read_meta, source_stats,
+                        write_meta)
+from indexes import RouteIndex, FlightIndex
+from price_cube import PriceCube
+from schema import apply_schema
+
+CHUNK_ROWS = 500_000
+# number of aggregated chunks kept before they are merged into the cube
+CUBE_PARTS = 16
+
+
+def get_store_dir(path):
+    """
+    Gets the directory of the on-disk store of a dataset
+
+    :param path: A string of the path to the csv file
+    :return: A string of the path to the store
+    """
+    return get_cache_dir(path) + ".store"
+
+
+def load_store(path, store_dir=None, chunksize=CHUNK_ROWS):
+    """
+    Opens the on-disk store of a dataset, streaming the csv into it first
+    when the store is missing or out of date
+
+    :param path: A string of the path to the csv file
+    :param store_dir: optional. A string of the directory of the store
+    :param chunksize: optional. An integer of the rows to read at a time
+    :return: A dictionary of the dataframe and indexes to build a
+     DataframeLogic with
+    """
+    if store_dir is None:
+        store_dir = get_store_dir(path)
+    meta = read_meta(store_dir)
+    if meta is None or not is_cache_valid(meta, path, store_dir):
+        ingest_csv(path, store_dir, chunksize)
+    return open_store(store_dir)
+
+
+def open_store(store_dir):
+    """
+    Memory maps a store written by ingest_csv
+
+    :param store_dir: A string of the directory of the store
+    :return: A dictionary of the dataframe and indexes to build a
+     DataframeLogic with
+    """
+    return {"df": read_cache(store_dir, read_meta(store_dir)),
+            "routes": RouteIndex.load(store_dir),
+            "flights": FlightIndex.load(store_dir),
+            "cube": PriceCube.load(store_dir)}
+
+
+def ingest_csv(path, store_dir, chunksize=CHUNK_ROWS):
+    """
+    Streams a csv into an on-disk columnar store one chunk at a time.
+    The route and flight indexes and the price cube are built from each
+    chunk, so the full table is never held in memory.
+
+    :param path: A string of the path to the csv file
+    :param store_dir: A string of the directory of the store
+    :param chunksize: optional. An integer of the rows to read at a time
+    """
+    source = source_stats(path)
+    temp_dir = store_dir + ".tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    writer = ColumnWriter(temp_dir)
+    routes = RouteIndex()
+    flights = FlightIndex()
+    spills = [IndexSpill(temp_dir, "routes", routes.routes),
+              IndexSpill(temp_dir, "classes", routes.classes),
+              IndexSpill(temp_dir, "flights", flights.flights)]
+    cube_parts = []
+    rows = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk = apply_schema(chunk)
+        writer.write(chunk)
+        for spill in spills:
+            spill.extend(chunk, rows)
+        cube_parts.append(PriceCube.aggregate(chunk))
+        if len(cube_parts) >= CUBE_PARTS:
+            cube_parts = [PriceCube.merge(cube_parts)]
+        rows += len(chunk)
+    columns = writer.finish(rows)
+    for spill in spills:
+        spill.finish()
+    if cube_parts:
+        PriceCube(cells=PriceCube.merge(cube_parts)).save(temp_dir)
+    write_meta(temp_dir, {"version": CACHE_VERSION, "source": source,
+                          "rows": rows, "columns": columns})
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(temp_dir, store_dir)
+
+
+class ColumnWriter:
+    """
+    Appends chunks of a dataframe to one raw binary file per column.
+    String and categorical columns are written as codes into categories that
+    grow as new values are seen.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.columns = []
+
+    def write(self, chunk):
+        """
+        Appends a chunk to the column files
+
+        :param chunk: A dataframe with the same columns as earlier chunks
+        """
+        if not self.columns:
+            for position, name in enumerate(chunk.columns):
+                dtype = chunk[name].dtype
+                coded = not (pd.api.types.is_numeric_dtype(dtype) or
+                             pd.api.types.is_bool_dtype(dtype))
+                self.columns.append({
+                    "name": name, "file": f"{position}.bin",
+                    "dtype": (np.dtype(np.int32) if coded
+                              else np.dtype(dtype)).str,
+                    "categories": {} if coded else None,
+                    "categorical": isinstance(dtype, pd.CategoricalDtype)})
+        for column in self.columns:
+            series = chunk[column["name"]]
+            if column["categories"] is None:
+                values = series.to_numpy(dtype=column["dtype"])
+            else:
+                values = self.encode(series, column["categories"])
+            with open(os.path.join(self.directory, column["file"]),
+                      "ab") as file:
+                np.ascontiguousarray(values).tofile(file)
+
+    @staticmethod
+    def encode(series, categories):
+        """
+        Converts a column of a chunk into codes of the store's categories
+
+        :param series: A series of a chunk
+        :param categories: A dictionary of the values seen so far to their
+         codes, new values are added to it
+        :return: An array of int32 codes, -1 for missing values
+        """
+        local, uniques = pd.factorize(series, use_na_sentinel=True)
+        lookup = np.array([categories.setdefault(value, len(categories))
+                           for value in uniques.tolist()] + [-1],
+                          dtype=np.int32)
+        # local code -1 picks the trailing -1 of the lookup
+        return lookup[local]
+
+    def finish(self, rows):
+        """
+        Sorts the categories of every coded column and narrows its codes to
+        the type pandas uses, then describes the columns
+
+        :param rows: An integer of the number of rows written
+        :return: A list of column descriptions for the store's metadata
+        """
+        for column in self.columns:
+            path = os.path.join(self.directory, column["file"])
+            if not os.path.exists(path):
+                open(path, "wb").close()
+            categories = column["categories"]
+            if categories is None:
+                continue
+            try:
+                values = sorted(categories)
+            except TypeError:
+                values = sorted(categories, key=str)
+            remap = np.empty(len(values) + 1, dtype=np.int32)
+            remap[[categories[value] for value in values]] = np.arange(
+                len(values), dtype=np.int32)
+            remap[-1] = -1
+            dtype = get_code_dtype(len(values))
+            self.rewrite(path, rows, remap, dtype)
+            column["categories"] = values
+            column["dtype"] = dtype.str
+        return self.columns
+
+    @staticmethod
+    def rewrite(path, rows, remap, dtype):
+        """
+        Rewrites a file of codes in chunks through a lookup table
+
+        :param path: A string of the path to the file of int32 codes
+        :param rows: An integer of the number of codes in the file
+        :param remap: An array mapping old codes to new codes
+        :param dtype: A numpy dtype of the new codes
+        """
+        temp = path + ".tmp"
+        with open(temp, "wb") as file:
+            if rows:
+                codes = np.memmap(path, dtype=np.int32, mode="r",
+                                  shape=(rows,))
+                for start in range(0, rows, CHUNK_ROWS):
+                    remap[codes[start:start + CHUNK_ROWS]].astype(
+                        dtype).tofile(file)
+                del codes
+        os.replace(temp, path)
+
+
+class IndexSpill:
+    """
+    Writes the segments of a GroupIndex to disk while a dataset is streamed,
+    then merges them into a single memory-mapped segment
+    """
+    def __init__(self, directory, name, index):
+        self.directory = directory
+        self.name = name
+        self.index = index
+        self.path = os.path.join(directory, f"{name}.spill")
+        self.file = open(self.path, "wb")
+        self.segments = []
+        self.rows = 0
+
+    def extend(self, df, offset):
+        """
+        Groups the rows of a chunk and spills their positions to disk
+
+        :param df: A chunk of the dataset
+        :param offset: An integer of the position of the chunk's first row
+        """
+        order, spans = self.index.build_segment(df, offset)
+        order.tofile(self.file)
+        self.segments.append((self.rows, len(order), spans))
+        self.rows += len(order)
+
+    def finish(self):
+        """Merges the spilled segments into the index's file"""
+        self.file.close()
+        if self.rows:
+            spill = np.memmap(self.path, dtype=np.int64, mode="r",
+                              shape=(self.rows,)).view(np.ndarray)
+            for start, length, spans in self.segments:
+                self.index.add_segment(spill[start:start + length], spans)
+            del spill
+        self.index.save(self.directory, self.name)
+        self.index.segments = []
+        os.remove(self.path)
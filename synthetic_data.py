@@ -0,0 +1,178 @@
+"""Generator of synthetic flight datasets for benchmarking"""
+import argparse
+import numpy as np
+import pandas as pd
+from schema import FLIGHT_SCHEMA
+
+CITIES = ["Delhi", "Mumbai", "Bangalore", "Kolkata", "Hyderabad", "Chennai"]
+# airlines of the real dataset and the prefix of their flight codes
+AIRLINES = {"Vistara": "UK", "Air_India": "AI", "Indigo": "6E",
+            "GO_FIRST": "G8", "AirAsia": "I5", "SpiceJet": "SG"}
+TIMES = ["Early_Morning", "Morning", "Afternoon", "Evening", "Night",
+         "Late_Night"]
+STOPS = ["zero", "one", "two_or_more"]
+CLASSES = ["Economy", "Business"]
+# price multipliers of the ticket classes and the number of stops
+CLASS_FACTORS = np.array([1.0, 7.0])
+STOP_FACTORS = np.array([1.0, 1.25, 1.1])
+CHUNK_ROWS = 1_000_000
+
+
+class FlightGenerator:
+    """
+    Generates rows that follow the flight schema.
+
+    Every flight code belongs to one airline and flies one route on a fixed
+    schedule, so the rows of a flight agree on everything but the class,
+    the days booked in advance and the price. Prices depend on the route,
+    class, stops and days left like the real dataset.
+    """
+    def __init__(self, routes=30, airlines=6, flights=1500, seed=0):
+        if flights < routes:
+            raise ValueError("There must be at least one flight per route")
+        self.rng = np.random.default_rng(seed)
+        self.cities = self.make_names(CITIES, "City", self.count_cities(routes))
+        self.airlines = self.make_names(list(AIRLINES), "Airline", airlines)
+        self.routes = [(source, end) for source in range(len(self.cities))
+                       for end in range(len(self.cities))
+                       if source != end][:routes]
+        self.codes = self.make_codes(flights)
+        # flight i flies route i % routes, so every route has flights
+        route = np.arange(flights) % routes
+        self.flight_route = route
+        self.flight_source = np.array([self.routes[i][0] for i in route])
+        self.flight_end = np.array([self.routes[i][1] for i in route])
+        self.flight_departure = self.rng.integers(0, len(TIMES), flights)
+        self.flight_arrival = self.rng.integers(0, len(TIMES), flights)
+        self.flight_stops = self.rng.choice(len(STOPS), flights,
+                                            p=[0.12, 0.83, 0.05])
+        self.flight_duration = np.round(
+            self.rng.uniform(0.8, 12, flights) * (1 + self.flight_stops),
+            2).astype(np.float32)
+        self.route_price = self.rng.uniform(3000, 7000, routes)
+
+    @staticmethod
+    def count_cities(routes):
+        """
+        Gets the number of cities needed to have some routes
+
+        :param routes: An integer of the number of routes
+        :return: An integer of the number of cities
+        """
+        cities = 2
+        while cities * (cities - 1) < routes:
+            cities += 1
+        return cities
+
+    @staticmethod
+    def make_names(names, prefix, count):
+        """
+        Gets names from a list, making up more when the list is too short
+
+        :param names: A list of real names to use first
+        :param prefix: A string to start made up names with
+        :param count: An integer of the number of names
+        :return: A list of names
+        """
+        return (names[:count] +
+                [f"{prefix}_{i}" for i in range(len(names), count)])
+
+    def make_codes(self, flights):
+        """
+        Makes the flight codes and assigns every flight to an airline
+
+        :param flights: An integer of the number of flight codes
+        :return: A list of flight codes
+        """
+        self.flight_airline = np.arange(flights) % len(self.airlines)
+        codes = []
+        for i, airline in enumerate(self.flight_airline):
+            name = self.airlines[airline]
+            prefix = AIRLINES.get(name, f"X{airline}")
+            codes.append(f"{prefix}-{100 + i // len(self.airlines)}")
+        return codes
+
+    def chunk(self, rows):
+        """
+        Generates rows of flights
+
+        :param rows: An integer of the number of rows
+        :return: A dataframe with the columns and types of the flight schema
+        """
+        flight = self.rng.integers(0, len(self.codes), rows)
+        f_class = (self.rng.random(rows) < 0.31).astype(np.int8)
+        days_left = self.rng.integers(1, 50, rows).astype(np.int16)
+        stops = self.flight_stops[flight]
+        price = (self.route_price[self.flight_route[flight]] *
+                 CLASS_FACTORS[f_class] * STOP_FACTORS[stops] *
+                 (1 + 1.5 * np.exp(-days_left / 8)) *
+                 self.rng.lognormal(0, 0.15, rows))
+        columns = {
+            "airline": (self.flight_airline[flight], self.airlines),
+            "flight": (flight, self.codes),
+            "source_city": (self.flight_source[flight], self.cities),
+            "departure_time": (self.flight_departure[flight], TIMES),
+            "stops": (stops, STOPS),
+            "arrival_time": (self.flight_arrival[flight], TIMES),
+            "destination_city": (self.flight_end[flight], self.cities),
+            "class": (f_class, CLASSES)}
+        df = pd.DataFrame({
+            name: pd.Categorical.from_codes(codes, categories)
+            for name, (codes, categories) in columns.items()})
+        df["duration"] = self.flight_duration[flight]
+        df["days_left"] = days_left
+        df["price"] = np.clip(price, 1, np.iinfo(np.int32).max).astype(
+            np.int32)
+        return df[list(FLIGHT_SCHEMA)]
+
+    def chunks(self, rows, chunk_rows=CHUNK_ROWS):
+        """
+        Generates rows of flights a chunk at a time
+
+        :param rows: An integer of the total number of rows
+        :param chunk_rows: optional. An integer of the rows in each chunk
+        :return: A generator of dataframes
+        """
+        for start in range(0, rows, chunk_rows):
+            yield self.chunk(min(chunk_rows, rows - start))
+
+
+def generate_frame(rows, **options):
+    """
+    Generates a synthetic dataset in memory
+
+    :param rows: An integer of the number of rows
+    :param options: routes, airlines, flights and seed for FlightGenerator
+    :return: A dataframe of flights
+    """
+    return FlightGenerator(**options).chunk(rows)
+
+
+def write_csv(path, rows, chunk_rows=CHUNK_ROWS, **options):
+    """
+    Writes a synthetic dataset to a csv file one chunk at a time, so
+    datasets larger than memory can be generated
+
+    :param path: A string of the path to write to
+    :param rows: An integer of the number of rows
+    :param chunk_rows: optional. An integer of the rows in each chunk
+    :param options: routes, airlines, flights and seed for FlightGenerator
+    """
+    generator = FlightGenerator(**options)
+    with open(path, "w", newline="") as file:
+        for number, chunk in enumerate(generator.chunks(rows, chunk_rows)):
+            chunk.to_csv(file, header=number == 0, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic flight dataset")
+    parser.add_argument("rows", type=int, help="number of rows")
+    parser.add_argument("path", help="csv file to write")
+    parser.add_argument("--routes", type=int, default=30)
+    parser.add_argument("--airlines", type=int, default=6)
+    parser.add_argument("--flights", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_csv(args.path, args.rows, routes=args.routes,
+              airlines=args.airlines, flights=args.flights, seed=args.seed)
@@ -0,0 +1,20 @@
+"""Shared fixtures of the tests"""
+import os
+import sys
+import pytest
+
+# the modules of the app live in the top directory of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import FlightGenerator  # noqa: E402
+
+
+@pytest.fixture
+def flights():
+    """
+    Generates two batches of rows of the same flights
+
+    :return: A tuple of the first rows and the rows added after them
+    """
+    generator = FlightGenerator(routes=12, flights=120, seed=1)
+    return generator.chunk(3000), generator.chunk(800)
@@ -0,0 +1,66 @@
+"""Tests of finding the cheapest fares"""
+import numpy as np
+import pandas as pd
+import pytest
+from fare_query import FareIndex
+from indexes import RouteIndex
+from schema import apply_schema
+
+
+def expected_fares(df, source, end, f_class=None, days=None, airlines=None,
+                   stops=None, count=10):
+    """
+    Finds the cheapest fares by filtering and sorting the whole dataframe,
+    the parameters are those of FareIndex.search
+
+    :return: An array of row positions, cheapest first
+    """
+    mask = (df.source_city == source) & (df.destination_city == end)
+    if f_class is not None:
+        mask &= df["class"] == f_class
+    if days is not None:
+        mask &= df.days_left.between(*days)
+    if airlines is not None:
+        mask &= df.airline.isin(airlines)
+    if stops is not None:
+        mask &= df.stops.isin(stops)
+    positions = np.flatnonzero(mask.to_numpy())
+    order = np.argsort(df.price.to_numpy()[positions], kind="stable")
+    return positions[order][:count]
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"f_class": "Business"},
+    {"days": (5, 15), "count": 25},
+    {"f_class": "Economy", "airlines": ["Vistara", "Indigo"],
+     "stops": ["zero"]},
+    {"airlines": ["No such airline"]},
+    {"days": (40, 49), "stops": ["one", "two_or_more"], "count": 300},
+])
+def test_search(flights, options):
+    df = apply_schema(flights[0])
+    routes = RouteIndex(df)
+    fares = FareIndex()
+    for source, end in routes.routes.get_keys():
+        np.testing.assert_array_equal(
+            fares.search(df, routes, source, end, **options),
+            expected_fares(df, source, end, **options))
+
+
+def test_search_after_append(flights):
+    first, added = flights
+    df = apply_schema(first)
+    routes = RouteIndex(df)
+    fares = FareIndex()
+    keys = list(routes.routes.get_keys())
+    for source, end in keys:
+        fares.search(df, routes, source, end)
+    # the route index learns the rows without the sorted routes being
+    # invalidated, a search must see that its route gained rows
+    df = apply_schema(pd.concat([first, added], ignore_index=True))
+    routes = RouteIndex(df)
+    for source, end in keys:
+        np.testing.assert_array_equal(
+            fares.search(df, routes, source, end, count=50),
+            expected_fares(df, source, end, count=50))
@@ -0,0 +1,94 @@
+"""Tests of reading the rows added to watched files"""
+import os
+import pandas.testing as tm
+from file_watch import FileWatcher
+from schema import apply_schema
+
+
+def write_rows(path, df, mode="w", header=True):
+    """
+    Writes rows to a csv file
+
+    :param path: A string of the path to the file
+    :param df: A dataframe of flights
+    :param mode: optional. "w" to replace the file or "a" to append to it
+    :param header: optional. False to leave out the header line
+    """
+    with open(path, mode, newline="") as file:
+        df.to_csv(file, index=False, header=header)
+
+
+def assert_rows(found, df):
+    """
+    Checks that the rows read are the rows written
+
+    :param found: A dataframe read by a FileWatcher
+    :param df: A dataframe of the rows written
+    """
+    tm.assert_frame_equal(found.astype(str), apply_schema(
+        df.reset_index(drop=True)).astype(str))
+
+
+def test_appended_rows(tmp_path, flights):
+    first, added = flights
+    path = str(tmp_path / "flights.csv")
+    write_rows(path, first)
+    watcher = FileWatcher(path)
+    assert watcher.check() is None
+    write_rows(path, added, "a", header=False)
+    assert_rows(watcher.check(), added)
+    assert watcher.check() is None
+
+
+def test_partial_last_line(tmp_path, flights):
+    first, added = flights
+    path = str(tmp_path / "flights.csv")
+    write_rows(path, first)
+    watcher = FileWatcher(path)
+    text = added.iloc[:3].to_csv(index=False, header=False)
+    cut = text.index("\n", text.index("\n") + 1) + 10
+    with open(path, "a", newline="") as file:
+        file.write(text[:cut])
+    # the line still being written waits for the next check
+    assert_rows(watcher.check(), added.iloc[:2])
+    with open(path, "a", newline="") as file:
+        file.write(text[cut:])
+    assert_rows(watcher.check(), added.iloc[2:3])
+    assert watcher.check() is None
+
+
+def test_replaced_file(tmp_path, flights):
+    first, added = flights
+    path = str(tmp_path / "flights.csv")
+    write_rows(path, first)
+    watcher = FileWatcher(path)
+    # a shorter file replacing the watched one has no rows known to be new
+    write_rows(path, added.iloc[:10])
+    assert watcher.check() is None
+    write_rows(path, added.iloc[10:20], "a", header=False)
+    assert_rows(watcher.check(), added.iloc[10:20])
+
+
+def test_directory(tmp_path, flights):
+    first, added = flights
+    write_rows(str(tmp_path / "old.csv"), first)
+    watcher = FileWatcher(str(tmp_path))
+    write_rows(str(tmp_path / "new.csv"), added)
+    # read once its size has not changed between two checks
+    assert watcher.check() is None
+    assert_rows(watcher.check(), added)
+    assert watcher.check() is None
+
+
+def test_directory_skips_bad_files(tmp_path, flights):
+    first, added = flights
+    watcher = FileWatcher(str(tmp_path))
+    write_rows(str(tmp_path / "a.csv"), added)
+    with open(tmp_path / "b.csv", "w") as file:
+        file.write("a,b\n1,2\n")
+    write_rows(str(tmp_path / "c.csv"), first.assign(days_left=100000))
+    write_rows(str(tmp_path / "d.csv"), first)
+    assert watcher.check() is None
+    os.remove(tmp_path / "d.csv")
+    assert_rows(watcher.check(), added)
+    assert watcher.check() is None
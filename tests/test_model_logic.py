@@ -0,0 +1,113 @@
+"""Tests of appending rows to DataframeLogic"""
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+from model_logic import DataframeLogic
+from synthetic_data import FlightGenerator
+
+
+def as_values(df):
+    """
+    Converts the categorical columns of a dataframe to strings, since the
+    categories of appended rows are added in a different order than a
+    rebuild sorts them
+
+    :param df: A dataframe of flights
+    :return: A dataframe of the same values
+    """
+    return df.astype({column: str for column in df.columns
+                      if isinstance(df[column].dtype, pd.CategoricalDtype)})
+
+
+def warm_up(logic, routes):
+    """
+    Runs the queries with caches, so an append has to update them
+
+    :param logic: A DataframeLogic
+    :param routes: A list of (source, destination) routes to query
+    """
+    for source, end in routes:
+        logic.queries.describe_departures(source, end)
+        logic.get_cheapest_fares(source, end)
+        logic.get_cheapest_fares(source, end, "Economy", days=(1, 20))
+        logic.get_itineraries(source, end)
+
+
+def assert_same_model(logic, rebuilt, routes):
+    """
+    Checks that two models answer every query the same
+
+    :param logic: A DataframeLogic rows were appended to
+    :param rebuilt: A DataframeLogic built from every row at once
+    :param routes: A list of (source, destination) routes to query
+    """
+    tm.assert_frame_equal(as_values(logic.orig_df), as_values(rebuilt.orig_df))
+    assert logic.days_range == rebuilt.days_range
+    for source, end in routes:
+        for f_class in [None, "Economy", "Business"]:
+            np.testing.assert_array_equal(
+                logic.routes.get_positions(source, end, f_class),
+                rebuilt.routes.get_positions(source, end, f_class))
+            if f_class is not None:
+                assert logic.cube.get_mean(source, end, f_class) == \
+                    pytest.approx(rebuilt.cube.get_mean(source, end, f_class))
+        for flight in logic.queries.get_flight_codes(source, end):
+            assert logic.queries.analyse_price(source, end, flight) == \
+                rebuilt.queries.analyse_price(source, end, flight)
+        assert logic.queries.describe_departures(source, end) == \
+            rebuilt.queries.describe_departures(source, end)
+        tm.assert_frame_equal(
+            as_values(logic.get_cheapest_fares(source, end)),
+            as_values(rebuilt.get_cheapest_fares(source, end)))
+        tm.assert_frame_equal(
+            as_values(logic.get_cheapest_fares(source, end, "Economy",
+                                               days=(1, 20))),
+            as_values(rebuilt.get_cheapest_fares(source, end, "Economy",
+                                                 days=(1, 20))))
+        tm.assert_frame_equal(logic.get_itineraries(source, end),
+                              rebuilt.get_itineraries(source, end))
+
+
+def get_routes(df):
+    """
+    Gets the routes of a dataframe
+
+    :param df: A dataframe of flights
+    :return: A sorted list of (source, destination) tuples
+    """
+    return sorted(df[["source_city", "destination_city"]].drop_duplicates()
+                  .itertuples(index=False, name=None))
+
+
+def test_append_matches_rebuild(flights):
+    first, added = flights
+    logic = DataframeLogic(first)
+    routes = get_routes(first)
+    warm_up(logic, routes)
+    changed = logic.append(added)
+    assert changed == set(get_routes(added))
+    rebuilt = DataframeLogic(pd.concat([first, added], ignore_index=True))
+    assert_same_model(logic, rebuilt, routes)
+
+
+def test_append_new_values(flights):
+    first, _ = flights
+    # more routes and airlines bring cities and airlines the model has not
+    # seen, which are added to the categories
+    added = FlightGenerator(routes=20, airlines=8, flights=200,
+                            seed=2).chunk(500)
+    logic = DataframeLogic(first)
+    warm_up(logic, get_routes(first))
+    logic.append(added)
+    rebuilt = DataframeLogic(pd.concat([first, added], ignore_index=True))
+    assert_same_model(logic, rebuilt, get_routes(rebuilt.orig_df))
+
+
+def test_append_nothing(flights):
+    first, added = flights
+    logic = DataframeLogic(first)
+    version = logic.version
+    assert logic.append(added.iloc[:0]) == set()
+    assert logic.version == version
+    assert len(logic.orig_df) == len(first)
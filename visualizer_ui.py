@@ -1,13 +1,16 @@
 """UI for the visualizer"""
-import abc
+from collections import OrderedDict
 import tkinter as tk
-from tkinter import ttk, font
-import matplotlib
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib import pyplot as plt
-import seaborn as sns
+from tkinter import ttk, font, filedialog
 from keypad import Keypad
-matplotlib.use("TkAgg")
+from observers import Observer
+from instrumentation import METRICS, timed, timer
+
+# size in pixels a graph takes before its canvas is created, the size of a
+# default matplotlib figure
+GRAPH_SIZE = (640, 480)
+# memory each graph may use to keep rendered graphs for reuse
+RENDER_CACHE_BYTES = 64 * 2**20
 
 
 class VisualizerUI(tk.Tk):
@@ -20,6 +23,9 @@ class VisualizerUI(tk.Tk):
         self.graphs = []
         self.labels = []
         self.text_boxes = []
+        self.spinboxes = []
+        self.diagnostics = None
+        self.period_window = None
         self.default_font = font.nametofont("TkDefaultFont")
         self.default_font.configure(family="Times", size=22)
         self.init_components()
@@ -32,6 +38,7 @@ class VisualizerUI(tk.Tk):
         """Initializes the ui components"""
         self.option_add("*TCombobox*Listbox*Font", self.default_font)
         self.init_menu()
+        self.init_status_bar()
         self.init_notebook()
 
     def init_menu(self):
@@ -40,16 +47,46 @@ class VisualizerUI(tk.Tk):
         menu_font.configure(size=18)
         menu_bar = tk.Menu(self)
         menu_bar.add_cascade(label="Exit", command=self.quit, font=menu_font)
+        menu_bar.add_command(label="Diagnostics", font=menu_font,
+                             command=self.show_diagnostics)
+        # enabled by the controller when the dataset is split into periods
+        menu_bar.add_command(label="Period", font=menu_font,
+                             state="disabled")
         self.configure(menu=menu_bar)
+        self.menu_bar = menu_bar
+
+    def show_diagnostics(self):
+        """Opens the diagnostics window, or raises it if it is open"""
+        if self.diagnostics is not None and self.diagnostics.winfo_exists():
+            self.diagnostics.lift()
+            return
+        self.diagnostics = DiagnosticsWindow(self)
+
+    def init_status_bar(self):
+        """Initializes the status bar used as a busy indicator"""
+        self.status = tk.Label(self, text="", anchor=tk.W,
+                               font=("Times", 14))
+        self.status.pack(side=tk.BOTTOM, fill="x", padx=5)
+
+    def set_busy(self, busy):
+        """
+        Shows whether the app is working on a query
+
+        :param busy: True if a query is running in the background
+        """
+        self.status["text"] = "Working..." if busy else ""
+        self.configure(cursor="watch" if busy else "")
 
     def init_notebook(self):
         """Initializes the notebook"""
         notebook = ttk.Notebook(self,width=1500, height=900)
         notebook.pack(pady=10, expand=True, anchor=tk.N, fill="both")
-        names = ["Flight search", "Flight planner", "Data summary"]
+        names = ["Flight search", "Flight planner", "Data summary",
+                 "Cheapest fares"]
         notebook.add(self.init_flight_search(), text=names[0])
         notebook.add(self.init_flight_planner(), text=names[1])
         notebook.add(self.init_data_summary(), text=names[2])
+        notebook.add(self.init_fare_search(), text=names[3])
         self.notebook = notebook
 
     def init_flight_search(self):
@@ -111,13 +148,15 @@ class VisualizerUI(tk.Tk):
                              label="mode:", radio=True)
         self.mode = mode_select
         type_select = Keypad(frame2, ["Distribution", "Scatter",
-                                    "Pie chart"], label="Type:", radio=True)
+                                      "Pie chart", "Heatmap", "Rank heatmap"],
+                             label="Type:", radio=True)
         self.type = type_select
         type_select["state"] = "disabled"
         graph = GraphManager(mainframe, 2)
         self.graphs.append(graph)
         scrollbar = tk.Scrollbar(frame2)
-        statistic = tk.Text(frame2, font=self.default_font, width=60,
+        # statistics are formatted as tables, so they need a monospaced font
+        statistic = tk.Text(frame2, font=("Courier", 18), width=60,
                             wrap=tk.WORD, yscrollcommand=scrollbar.set)
         scrollbar.pack(side=tk.RIGHT, fill="y")
         scrollbar.configure(command=statistic.yview)
@@ -196,67 +235,305 @@ class VisualizerUI(tk.Tk):
         mainframe.pack(fill="both", expand=True)
         return mainframe
 
+    def init_fare_search(self):
+        """Initializes the cheapest fares page"""
+        mainframe = tk.Frame(self)
+        frame1 = tk.Frame(mainframe)
+        frame2 = tk.Frame(mainframe)
+        settings = {"padx": 5, "pady": 5, "anchor": tk.W, "fill": "x"}
+        for text in ["From:", "To:", "Class:", "Airline:", "Stops:"]:
+            tk.Label(frame1, text=text).pack(**settings)
+            combo = ttk.Combobox(frame1, font=self.default_font)
+            combo.pack(**settings)
+            self.comboboxes.append(combo)
+        for text, low, high, value in [("Days left from:", 1, 365, 1),
+                                       ("Days left to:", 1, 365, 50),
+                                       ("Fares:", 1, 1000, 20)]:
+            tk.Label(frame1, text=text).pack(**settings)
+            spinbox = tk.Spinbox(frame1, from_=low, to=high,
+                                 font=self.default_font)
+            spinbox.delete(0, "end")
+            spinbox.insert(0, value)
+            spinbox.pack(**settings)
+            self.spinboxes.append(spinbox)
+        self.search_button = tk.Button(frame1, text="Search")
+        self.search_button.pack(**settings)
+        self.itinerary_buttons = []
+        for text in ["Cheapest connections", "Fastest connections"]:
+            button = tk.Button(frame1, text=text)
+            button.pack(**settings)
+            self.itinerary_buttons.append(button)
+        scrollbar = tk.Scrollbar(frame2)
+        # the columns are set from the first results, click one to sort
+        self.fare_table = ttk.Treeview(frame2, show="headings",
+                                       yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill="y")
+        scrollbar.configure(command=self.fare_table.yview)
+        self.fare_table.pack(expand=True, fill="both")
+        mainframe.grid_columnconfigure((0, 1, 2, 3, 4, 5),
+                                       uniform="1", weight=1)
+        mainframe.grid_rowconfigure(0, weight=1)
+        settings = {"padx": 5, "pady": 5}
+        frame1.grid(row=0, column=0, sticky="nsew", **settings)
+        frame2.grid(row=0, column=1, sticky="nsew", columnspan=5, **settings)
+        mainframe.pack(fill="both", expand=True)
+        return mainframe
+
     def run(self):
         """Runs the app"""
         self.mainloop()
 
 
-class Observer(abc.ABC):
-    """An interface for the GraphManager"""
-    @abc.abstractmethod
-    def update_graph(self, logic):
-        """Receive an update from the model"""
-        raise NotImplementedError
+def set_backend():
+    """
+    Selects matplotlib's Tk backend. Runs on the Tk thread, before seaborn
+    imports pyplot from a background thread with import_plotting.
+    """
+    import matplotlib
+    matplotlib.use("TkAgg")
+
+
+def import_plotting():
+    """
+    Imports the Tk backend and seaborn. They take longer to import than the
+    rest of the app, so they are imported when the first graph is drawn
+    instead of when the UI is created, or ahead of time from a background
+    thread while the data loads once set_backend has been called.
+    """
+    from matplotlib.backends import backend_tkagg
+    import plotting
+
+
+def load_plotting():
+    """Selects matplotlib's Tk backend and imports matplotlib and seaborn"""
+    set_backend()
+    import_plotting()
+
+
+class DiagnosticsWindow(tk.Toplevel):
+    """A window showing the latency of the app's hot paths"""
+    def __init__(self, parent, refresh=1000):
+        super().__init__(parent)
+        self.title("Diagnostics")
+        self.refresh = refresh
+        self.init_components()
+        self.update_report()
+
+    def init_components(self):
+        """Initializes the report and its buttons"""
+        buttons = tk.Frame(self)
+        tk.Button(buttons, text="Save...", command=self.save).pack(
+            side=tk.LEFT, padx=5, pady=5)
+        tk.Button(buttons, text="Reset", command=METRICS.reset).pack(
+            side=tk.LEFT, padx=5, pady=5)
+        buttons.pack(side=tk.BOTTOM, fill="x")
+        tk.Label(self, text="Latency of recent calls in milliseconds").pack(
+            anchor=tk.W, padx=5)
+        self.report = tk.Text(self, font=("Courier", 12), width=100,
+                              height=30, wrap=tk.NONE)
+        self.report.pack(expand=True, fill="both", padx=5, pady=5)
+
+    def update_report(self):
+        """Shows the latest statistics and schedules the next refresh"""
+        if not self.winfo_exists():
+            return
+        self.report.config(state="normal")
+        self.report.delete(1.0, "end")
+        self.report.insert(tk.END, METRICS.report())
+        self.report.config(state="disabled")
+        self.after(self.refresh, self.update_report)
+
+    def save(self):
+        """Asks for a file and writes the statistics to it"""
+        path = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".json",
+            filetypes=[("JSON", "*.json")])
+        if path:
+            METRICS.dump(path)
+
+
+class PeriodWindow(tk.Toplevel):
+    """A window to pick the time window of a partitioned dataset"""
+    def __init__(self, parent, periods, window=None):
+        super().__init__(parent)
+        self.title("Period")
+        self.periods = periods
+        self.init_components()
+        start, end = window or (periods[0], periods[-1])
+        self.start.set(start)
+        self.end.set(end)
+
+    def init_components(self):
+        """Initializes the period comboboxes and the buttons"""
+        for row, text in enumerate(["From", "To"]):
+            tk.Label(self, text=text).grid(row=row, column=0, padx=5, pady=5,
+                                           sticky=tk.W)
+        self.start = ttk.Combobox(self, values=self.periods, state="readonly")
+        self.start.grid(row=0, column=1, padx=5, pady=5)
+        self.end = ttk.Combobox(self, values=self.periods, state="readonly")
+        self.end.grid(row=1, column=1, padx=5, pady=5)
+        buttons = tk.Frame(self)
+        self.apply_button = tk.Button(buttons, text="Apply")
+        self.apply_button.pack(side=tk.LEFT, padx=5, pady=5)
+        self.all_button = tk.Button(buttons, text="All periods")
+        self.all_button.pack(side=tk.LEFT, padx=5, pady=5)
+        buttons.grid(row=2, column=0, columnspan=2)
+
+    def get_window(self):
+        """
+        Gets the chosen time window
+
+        :return: A tuple of the first and last date, in order
+        """
+        return tuple(sorted([self.start.get(), self.end.get()]))
 
 
 class GraphManager(tk.Frame, Observer):
     """A class for managing graphs"""
     def __init__(self, parent, graph_type=1):
-        super().__init__(parent)
+        super().__init__(parent, width=GRAPH_SIZE[0], height=GRAPH_SIZE[1])
         self.type = graph_type
-        self.init_components()
+        self.cache = OrderedDict()
+        self.cache_bytes = 0
+        # the canvas is created the first time the graph is drawn
+        self.fig = None
+        self.ax = None
+        self.canvas = None
 
     def init_components(self):
         """Initializes the graph components"""
-        self.fig, self.ax = plt.subplots()
+        load_plotting()
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        self.fig = Figure()
+        self.ax = self.fig.subplots()
         self.canvas = FigureCanvasTkAgg(figure=self.fig, master=self)
         self.canvas.get_tk_widget().pack(side=tk.BOTTOM, fill=tk.BOTH,
                                          expand=True)
 
+    def set_figure(self, figure):
+        """
+        Shows a figure on the canvas
+
+        :param figure: A matplotlib figure to show
+        """
+        figure.set_size_inches(self.fig.get_size_inches(), forward=False)
+        figure.set_canvas(self.canvas)
+        self.canvas.figure = figure
+        self.fig = figure
+        self.ax = figure.axes[0] if figure.axes else figure.subplots()
+
+    def fingerprint(self, logic):
+        """
+        Gets a key identifying the graph the model asks for
+
+        :param logic: A dataframe object for plotting
+        :return: A tuple of the values the graph is drawn from
+        """
+        if self.type == 1:
+            return self.type, logic.selection, logic.pair
+        if self.type == 2:
+            return (self.type, logic.selection, logic.graph_type,
+                    repr(sorted(logic.arguments.items())), logic.title)
+        return self.type, logic.summary_graph
+
+    @timed()
+    def restore(self, key):
+        """
+        Shows a cached graph if there is one
+
+        :param key: A tuple from fingerprint
+        :return: True if the graph was restored from the cache
+        """
+        if key not in self.cache:
+            return False
+        self.cache.move_to_end(key)
+        figure, region, size, _ = self.cache[key]
+        self.set_figure(figure)
+        if size == self.canvas.get_width_height():
+            self.canvas.restore_region(region)
+            self.canvas.blit()
+        else:
+            # the window was resized since the graph was cached
+            self.canvas.draw()
+            self.store(key)
+        return True
+
+    def store(self, key):
+        """
+        Caches the graph on the canvas, evicting the least recently used
+        graphs when the cache is too big
+
+        :param key: A tuple from fingerprint
+        """
+        if key in self.cache:
+            self.cache_bytes -= self.cache.pop(key)[3]
+        size = self.canvas.get_width_height()
+        region = self.canvas.copy_from_bbox(self.fig.bbox)
+        cost = size[0] * size[1] * 4 + estimate_artist_bytes(self.fig)
+        self.cache[key] = (self.fig, region, size, cost)
+        self.cache_bytes += cost
+        while self.cache_bytes > RENDER_CACHE_BYTES and len(self.cache) > 1:
+            self.cache_bytes -= self.cache.popitem(last=False)[1][3]
+
+    def data_changed(self, logic, routes):
+        """
+        Forgets the cached graphs drawn from rows of routes that changed
+
+        :param logic: A dataframe object for plotting
+        :param routes: A set of (source, destination) tuples that gained rows,
+         None when the whole dataset was replaced
+        """
+        for key in list(self.cache):
+            # summary graphs are drawn from every row
+            selection = key[1] if self.type in (1, 2) else ("all",)
+            if logic.is_affected(selection, routes):
+                self.cache_bytes -= self.cache.pop(key)[3]
+
     def update_graph(self, logic):
         """Updates the graph if the model is in the same state as the graph"""
         if self.type == logic.state:
             self.draw(logic)
 
+    @timed()
     def draw(self, logic):
         """
         Draws the graph depending on the graph's type
 
         :param logic: A dataframe object for plotting
         """
+        if self.canvas is None:
+            self.init_components()
+        key = self.fingerprint(logic)
+        if self.restore(key):
+            return
+        from matplotlib.figure import Figure
+        self.set_figure(Figure(dpi=self.fig.dpi))
         if self.type == 1:
-            self.draw_dist_plot(logic.cur_df, logic.pair)
+            self.draw_dist_plot(logic.get_price_bins(), logic.pair)
         elif self.type == 2:
             self.draw_custom_plot(logic.cur_df, logic.graph_type,
                                   logic.arguments, logic.title)
         elif self.type == 3:
-            self.draw_summary_plot(logic.orig_df, logic.index)
+            self.draw_summary_plot(logic.orig_df, logic.summary_graph)
+        self.store(key)
 
-    def draw_dist_plot(self, data, pair):
+    @timed()
+    def draw_dist_plot(self, bins, pair):
         """
-        Draw the graph from the dataframe
+        Draw the price histogram from precomputed bin counts
 
-        :param data: A dataframe object to plot
+        :param bins: A tuple of the bin edges and a dictionary of ticket
+         classes to arrays of bin counts
         :param pair: A tuple of strings to use in the title
         """
-        self.ax.clear()
-        self.ax.set_title(f"price distribution of flights from {pair[0]}"
-                          f" to {pair[1]}")
-        self.ax.set_xlabel("price (rupee)")
-        sns.histplot(data=data, x="price", log_scale=True,
-                     hue="class", ax=self.ax)
-        self.canvas.draw()
+        import plotting
+        with timer("plotting.draw_dist_plot"):
+            plotting.draw_dist_plot(self.ax, bins, pair)
+        with timer("canvas.draw"):
+            self.canvas.draw()
 
+    @timed()
     def draw_custom_plot(self, data, graph_type,args, title):
         """
         Draw a non-predetermined graph on the canvas
@@ -268,21 +545,13 @@ class GraphManager(tk.Frame, Observer):
         """
         self.canvas.figure.clear()
         self.ax = self.canvas.figure.subplots()
-        self.ax.set_title(title)
-        if graph_type == "Histogram":
-            sns.histplot(data=data, **args, ax=self.ax)
-            if "binwidth" in args:
-                self.ax.set_xticks(range(0,51, 2))
-        elif graph_type == "Count":
-            sns.countplot(data=data, **args, ax=self.ax)
-        elif graph_type == "Scatter":
-            sns.scatterplot(data=data, **args, ax=self.ax)
-        elif graph_type == "Pie":
-            self.ax.pie(data=data, **args, autopct='%.1f%%', startangle=0)
-        elif graph_type == "Box":
-            sns.boxplot(data=data, **args, ax=self.ax)
-        self.canvas.draw()
+        import plotting
+        with timer(f"plotting.draw_custom_plot {graph_type}"):
+            plotting.draw_custom_plot(self.ax, data, graph_type, args, title)
+        with timer("canvas.draw"):
+            self.canvas.draw()
 
+    @timed()
     def draw_summary_plot(self, data, index):
         """
         Draw the corresponding graph for the summary page
@@ -292,44 +561,26 @@ class GraphManager(tk.Frame, Observer):
         """
         self.canvas.figure.clear()
         self.ax = self.canvas.figure.subplots()
-        if index == 0:
-            airlines = []
-            for airline in list(data.airline.unique()):
-                air_data = data[data.airline == airline]
-                airlines.append(air_data)
-            colors = ["r", "g", "b", 'y', 'pink', 'purple']
-            sorted_a = []
-            for airline in airlines:
-                dfs = airline.groupby("stops").price.mean()
-                sorted_a.append(dfs)
-            for airlines in sorted_a:
-                if airlines.shape[0] < 3:
-                    airlines.loc[2] = 0
-            bottom = 0
-            for i in range(6):
-                self.ax.bar(["0", "1", "2"], sorted_a[i], color=colors[i],
-                            bottom=bottom)
-                bottom += sorted_a[i]
-            self.ax.autoscale()
-            self.ax.legend(list(data.airline.unique()))
-            self.ax.set_xlabel("stops")
-            self.ax.set_ylabel("price")
-            self.ax.set_title("Mean price of flights by number of stops by"
-                              " airline")
-        elif index == 1:
-            data = data[data["class"] == "Economy"]
-            sns.scatterplot(data=data, x="days_left", y="price", ax=self.ax)
-            self.ax.set_xlabel("days booked before flight")
-            self.ax.set_ylabel("price")
-            self.ax.set_title("Scatter plot of days booked before flight and"
-                              " price for Economy tickets")
-        elif index == 2:
-            data = data[data["class"] == "Economy"]
-            data = data.groupby(["departure_time","arrival_time"]).price.mean()
-            data.unstack().plot.bar(ax=self.ax, rot=0)
-            self.ax.set(ylim=(3000, 9000))
-            self.ax.set_title("Economy ticket price distribution by departure "
-                              "and arrival time")
-            self.ax.set_xlabel("departure time")
-            self.ax.set_ylabel("price")
-        self.canvas.draw()
+        import plotting
+        with timer(f"plotting.draw_summary_plot {index}"):
+            plotting.draw_summary_plot(self.ax, data, index)
+        with timer("canvas.draw"):
+            self.canvas.draw()
+
+
+def estimate_artist_bytes(figure):
+    """
+    Estimates the memory used by the data drawn on a figure
+
+    :param figure: A matplotlib figure
+    :return: An integer of the number of bytes of the plotted data
+    """
+    total = 0
+    for ax in figure.axes:
+        for collection in ax.collections:
+            total += collection.get_offsets().nbytes
+            total += sum(path.vertices.nbytes
+                         for path in collection.get_paths())
+        for line in ax.lines:
+            total += line.get_xydata().nbytes
+    return total
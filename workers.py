@@ -0,0 +1,144 @@
+"""Background workers for the visualizer's controller"""
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import METRICS
+
+# queries running at once, the model's queries for worker threads leave its
+# selection alone so they do not need to take turns
+QUERY_WORKERS = 4
+
+
+class BackgroundWorker:
+    """
+    Runs model queries off the Tk thread.
+
+    Results are handed back to the Tk thread by polling a queue with after(),
+    since Tk widgets may only be touched from the thread running mainloop.
+    Every request belongs to a channel and a newer request on the same
+    channel makes the older one stale, so its result is never delivered.
+    """
+    def __init__(self, root, max_workers=QUERY_WORKERS, poll_interval=20,
+                 on_busy=None):
+        self.root = root
+        # tasks must not change what the model shows, that is left to the
+        # callbacks on the Tk thread
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="worker")
+        self.poll_interval = poll_interval
+        self.on_busy = on_busy
+        self.results = queue.Queue()
+        self.latest = {}
+        self.pending = {}
+        self.polling = False
+
+    def submit(self, channel, task, callback, *args, busy=True,
+               on_error=None):
+        """
+        Runs a task in the background and delivers its result on the Tk thread
+
+        :param channel: A string naming the widget or action the task is for
+        :param task: A function to run in a worker thread
+        :param callback: A function called on the Tk thread with the result
+        :param args: Arguments to call the task with
+        :param busy: optional. False to not show the busy indicator, for
+         periodic tasks the user did not ask for
+        :param on_error: optional. A function called on the Tk thread with
+         the exception if the task fails, which is reported either way
+        """
+        previous = self.pending.get(channel)
+        if previous is not None:
+            previous.cancel()
+        request = self.latest.get(channel, 0) + 1
+        self.latest[channel] = request
+        start = time.perf_counter()
+        future = self.executor.submit(self.run, channel, task, *args)
+        self.pending[channel] = future
+        future.add_done_callback(
+            lambda done: self.results.put((channel, request, done, callback,
+                                           on_error, start)))
+        if busy:
+            self.set_busy(True)
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_interval, self.poll)
+
+    def poll(self):
+        """Delivers finished results and keeps polling while work is pending"""
+        try:
+            self.deliver_results()
+        finally:
+            # scheduled whatever happened, or every later result is dropped
+            if self.pending:
+                self.root.after(self.poll_interval, self.poll)
+            else:
+                self.polling = False
+                self.set_busy(False)
+
+    def deliver_results(self):
+        """Hands every finished result that is not stale to its callback"""
+        while True:
+            try:
+                (channel, request, future, callback, on_error,
+                 start) = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if request != self.latest[channel]:
+                # a newer request replaced this one, drop the stale result
+                continue
+            del self.pending[channel]
+            if future.cancelled():
+                continue
+            try:
+                self.deliver(channel, future, callback, on_error, start)
+            except Exception as error:
+                # a failing callback must not stop the results of later
+                # requests from being delivered
+                self.root.report_callback_exception(type(error), error,
+                                                    error.__traceback__)
+
+    def deliver(self, channel, future, callback, on_error, start):
+        """
+        Hands the result of a finished task to its callback
+
+        :param channel: A string naming the widget or action the task is for
+        :param future: A finished Future of the task
+        :param callback: A function called with the result
+        :param on_error: A function called with the exception if the task
+         failed, None to only report it
+        :param start: A float of the time the task was requested
+        """
+        error = future.exception()
+        if error is not None:
+            if on_error is not None:
+                on_error(error)
+            raise error
+        callback(future.result())
+        # the time the user waited, from the request to the result shown
+        METRICS.record(f"{channel} round trip", time.perf_counter() - start)
+
+    @staticmethod
+    def run(channel, task, *args):
+        """
+        Runs a task in a worker thread and records how long it took
+
+        :param channel: A string naming the widget or action the task is for
+        :param task: A function to run
+        :param args: Arguments to call the task with
+        :return: The result of the task
+        """
+        with METRICS.timer(f"{channel} task"):
+            return task(*args)
+
+    def set_busy(self, busy):
+        """
+        Shows or hides the busy indicator
+
+        :param busy: True if there is work running in the background
+        """
+        if self.on_busy is not None:
+            self.on_busy(busy)
+
+    def shutdown(self):
+        """Stops the workers, dropping any queued tasks"""
+        self.executor.shutdown(wait=False, cancel_futures=True)